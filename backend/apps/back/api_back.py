@@ -2,19 +2,19 @@ import datetime
 import posixpath
 
 from django.contrib.auth.hashers import make_password
-from django.core.paginator import Paginator
 from django.http import HttpRequest
 from ninja import Router, Schema
 from ninja.files import UploadedFile
 from ninja.params.functions import Body, File, Query
 from ninja.security.session import SessionAuth
 
-from backend.apps.back.models import AdminPermission, AdminUser, Role
+from backend.apps.back.models import AdminPermission, AdminUser, Role, role_permission_cache
 from backend.decorator.response import schema_response
-from backend.response import D, L
+from backend.response import D, L, LStream
 from backend.security import auth_admin
 from backend.settings import DOMAIN_NAME, MEDIA_URL_PATH, get_logger, get_redis_connection
 from backend.storage import HashedFileSystemStorage
+from backend.utils.paginator import CachedCountPaginator, count_cache
 
 from .schema import (
     AdminPermissionModelSchema,
@@ -47,7 +47,6 @@ def post_admin_login(
             password=make_password(password),
             is_superadmin=True,
         )
-        AdminPermission.sync_data()
 
     user = AdminUser.objects.filter(username=username).first()
     if user and user.check_password(password):
@@ -144,6 +143,7 @@ def get_admin_user_info_detail(
     else:
         admin_user = user
 
+    (admin_user,) = AdminUser.prefetch_permissions([admin_user])
     data = AdminUserModelSchema.from_orm(admin_user)
     return D.ok(data)
 
@@ -166,9 +166,9 @@ def get_admin_user_info_list(
     if username:
         queryset = queryset.filter(username__icontains=username)
 
-    paginator = Paginator(queryset, size)
+    paginator = CachedCountPaginator(queryset, size)
     page_queryset = paginator.page(page)
-    data = [AdminUserModelSchema.from_orm(i) for i in page_queryset]
+    data = [AdminUserModelSchema.from_orm(i) for i in AdminUser.prefetch_permissions(page_queryset)]
     return L.page(data, page=page_queryset)
 
 
@@ -184,7 +184,7 @@ def get_admin_permission_list(
         raise ValueError("没有权限")
 
     queryset = AdminPermission.objects.all().order_by("id")
-    page_queryset = Paginator(queryset, size).page(page)
+    page_queryset = CachedCountPaginator(queryset, size).page(page)
     data = [AdminPermissionModelSchema.from_orm(i) for i in page_queryset]
     return L.page(data, page=page_queryset)
 
@@ -223,7 +223,7 @@ def get_admin_role_list(
         raise ValueError("没有权限")
 
     queryset = Role.objects.order_by("id")
-    page_queryset = Paginator(queryset, size).page(page)
+    page_queryset = CachedCountPaginator(queryset, size).page(page)
     data = [RoleModelSchema.from_orm(i) for i in page_queryset]
     return L.page(data, page=page_queryset)
 
@@ -265,6 +265,7 @@ def post_admin_role_add(
     if role:
         raise ValueError("角色已存在")
     Role.objects.create(name=name, description=description)
+    count_cache.invalidate(Role)
     return D.success()
 
 
@@ -311,6 +312,7 @@ def post_admin_role_permission_add(
         raise ValueError("权限不存在")
 
     role.permission.add(permission)
+    role_permission_cache.invalidate(role.pk)
     return D.success()
 
 
@@ -334,6 +336,7 @@ def post_admin_role_permission_remove(
         raise ValueError("权限不存在")
 
     role.permission.remove(permission)
+    role_permission_cache.invalidate(role.pk)
     return D.success()
 
 
@@ -363,6 +366,7 @@ def post_admin_user_add(
         password=make_password(password),
         role=role,
     )
+    count_cache.invalidate(AdminUser)
     return D.success()
 
 
@@ -370,20 +374,18 @@ def post_admin_user_add(
 @schema_response
 def get_admin_dropdown_role(
     request: HttpRequest,
-) -> L[RoleModelSchema]:
+) -> LStream[RoleModelSchema]:
     queryset = Role.objects.all()
-    data = [RoleModelSchema.from_orm(i) for i in queryset]
-    return L.ok(data)
+    return L.stream(queryset, RoleModelSchema.from_orm)
 
 
 @router.get("admin/dropdown/permission", summary="权限选择下拉")
 @schema_response
 def get_admin_dropdown_permission(
     request: HttpRequest,
-) -> L[AdminPermissionModelSchema]:
+) -> LStream[AdminPermissionModelSchema]:
     queryset = AdminPermission.objects.all()
-    data = [AdminPermissionModelSchema.from_orm(i) for i in queryset]
-    return L.ok(data)
+    return L.stream(queryset, AdminPermissionModelSchema.from_orm)
 
 
 @router.post("admin/user/role/edit", auth=auth_admin, summary="后台管理员角色修改")
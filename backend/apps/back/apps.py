@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BackConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "backend.apps.back"
+
+    def ready(self):
+        from backend.apps.back import signals
+
+        post_migrate.connect(signals.sync_admin_permission, sender=self)
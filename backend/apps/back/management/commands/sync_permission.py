@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from backend.apps.back.models import AdminPermission
+
+
+class Command(BaseCommand):
+    help = "同步后台权限, migrate 后会自动执行"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="数据库")
+
+    def handle(self, *args, **options):
+        AdminPermission.sync_data(using=options["database"])
+        count = AdminPermission.objects.using(options["database"]).count()
+        self.stdout.write(self.style.SUCCESS(f"Synced admin permissions, total {count}"))
@@ -1,9 +1,12 @@
+from collections.abc import Iterable
 from urllib.parse import urljoin
 
 from django.contrib.auth.hashers import check_password, make_password
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import prefetch_related_objects
 
-from backend.settings import BASE_URL, DB_PREFIX
+from backend.settings import BASE_URL, DB_PREFIX, REDIS_PREFIX, get_redis_connection
+from backend.utils.cache import RedisSetCache
 
 
 def get_default_avatar():
@@ -27,12 +30,31 @@ class AdminPermission(models.Model):
         return self.key
 
     @staticmethod
-    def sync_data():
-        for i in AdminPermission.Keys:
-            if not AdminPermission.objects.filter(key=i.value).exists():
-                AdminPermission.objects.create(key=i.value, name=i.label)
-            else:
-                AdminPermission.objects.filter(key=i.value).update(name=i.label)
+    def sync_data(using: str = DEFAULT_DB_ALIAS, model: "type[AdminPermission] | None" = None):
+        """
+        同步 Keys 到数据库, 新增缺少的权限, 更新名称变化的权限, 可重复执行
+
+        model: 权限模型, migrate 中使用迁移状态中的历史模型, 默认为 AdminPermission
+        """
+        if model is None:
+            model = AdminPermission
+        with transaction.atomic(using=using):
+            manager = model._default_manager.using(using)
+            existing = {i.key: i for i in manager.filter(key__in=AdminPermission.Keys.values).only("id", "key", "name")}
+            to_create: list[AdminPermission] = []
+            to_update: list[AdminPermission] = []
+            for key, label in AdminPermission.Keys.choices:
+                permission = existing.get(key)
+                if permission is None:
+                    to_create.append(model(key=key, name=label))
+                elif permission.name != label:
+                    permission.name = label
+                    to_update.append(permission)
+            if to_create:
+                # 多个进程同时同步时忽略已创建的
+                manager.bulk_create(to_create, ignore_conflicts=True)
+            if to_update:
+                manager.bulk_update(to_update, ["name"])
 
     @property
     def is_admin(self) -> bool:
@@ -40,6 +62,7 @@ class AdminPermission(models.Model):
 
 
 class RolePermission(models.Model):
+    role_id: int
     role: "models.ForeignKey[Role]"
     role = models.ForeignKey("Role", on_delete=models.PROTECT, verbose_name="角色")
     permission = models.ForeignKey(AdminPermission, on_delete=models.PROTECT, verbose_name="权限")
@@ -64,12 +87,18 @@ class Role(models.Model):
         return self.name
 
     @property
-    def permission_list(self):
-        return list(self.permission.values_list("key", flat=True))
+    def permission_list(self) -> list[str]:
+        # 使用 all() 以便复用 prefetch_related("permission") 的结果
+        return [i.key for i in self.permission.all()]
+
+    @property
+    def permission_set(self) -> frozenset[str]:
+        """角色权限标识集合, 读取缓存"""
+        return role_permission_cache.get(self.pk)
 
     @property
     def is_admin(self) -> bool:
-        return RolePermission.objects.filter(role=self, permission__key=AdminPermission.Keys.Admin).exists()
+        return AdminPermission.Keys.Admin.value in self.permission_set
 
 
 class AdminUser(models.Model):
@@ -103,6 +132,13 @@ class AdminUser(models.Model):
             permission_list.append(AdminPermission.Keys.Admin)
         return permission_list
 
+    @staticmethod
+    def prefetch_permissions(users: Iterable["AdminUser"]) -> list["AdminUser"]:
+        """批量加载角色及角色权限, 供 role_name, permissions 使用, 查询次数与用户数量无关"""
+        users = list(users)
+        prefetch_related_objects(users, "role", "role__permission")
+        return users
+
     def has_permission(self, permission: AdminPermission.Keys | str) -> bool:
         if self.is_superadmin:
             return True
@@ -110,14 +146,10 @@ class AdminUser(models.Model):
         if isinstance(permission, AdminPermission.Keys):
             permission = permission.value
 
-        role_permissions: list[str] = []
+        if not self.role_id:
+            return False
 
-        if self.role_id:
-            role_permissions.extend(
-                RolePermission.objects.filter(
-                    role_id=self.role_id,
-                ).values_list("permission__key", flat=True)
-            )
+        role_permissions = role_permission_cache.get(self.role_id)
 
         if AdminPermission.Keys.Admin.value in role_permissions:
             return True
@@ -134,3 +166,14 @@ class AdminUser(models.Model):
     @property
     def is_admin(self) -> bool:
         return self.is_superadmin or self.has_permission(AdminPermission.Keys.Admin)
+
+
+def load_role_permissions(role_id: int):
+    return RolePermission.objects.filter(role_id=role_id).values_list("permission__key", flat=True)
+
+
+role_permission_cache = RedisSetCache[int](
+    redis_conn=get_redis_connection(),
+    prefix=f"{REDIS_PREFIX}:Role:permission",
+    loader=load_role_permissions,
+)
@@ -0,0 +1,66 @@
+from django.apps import AppConfig
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from backend.apps.back.models import AdminPermission, Role, RolePermission, role_permission_cache
+
+
+def invalidate_role_permission(role_id: int | None):
+    if role_id is None:
+        return
+    role_permission_cache.invalidate(role_id)
+    # 事务提交前其他进程可能读到旧数据并写回 redis, 提交后再删除一次
+    transaction.on_commit(lambda: role_permission_cache.invalidate(role_id))
+
+
+def clear_role_permission():
+    role_permission_cache.clear()
+    transaction.on_commit(role_permission_cache.clear)
+
+
+@receiver([post_save, post_delete], sender=RolePermission)
+def on_role_permission_changed(sender, instance: RolePermission, **kwargs):
+    invalidate_role_permission(instance.role_id)
+
+
+@receiver([post_save, post_delete], sender=Role)
+def on_role_changed(sender, instance: Role, **kwargs):
+    invalidate_role_permission(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=AdminPermission)
+def on_admin_permission_changed(sender, instance: AdminPermission, created: bool = False, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if created or (update_fields is not None and "key" not in update_fields):
+        return
+    clear_role_permission()
+
+
+@receiver(m2m_changed, sender=RolePermission)
+def on_role_permission_m2m_changed(
+    sender, instance: Role | AdminPermission, action: str, reverse: bool, pk_set, **kwargs
+):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        invalidate_role_permission(instance.pk)
+    elif pk_set:
+        for role_id in pk_set:
+            invalidate_role_permission(role_id)
+    else:
+        clear_role_permission()
+
+
+def sync_admin_permission(sender: AppConfig, using: str, apps=global_apps, **kwargs):
+    """
+    migrate 后同步权限, 在 BackConfig.ready 中连接 post_migrate
+
+    apps: 迁移后的模型状态, back 未迁移或已回滚(migrate back zero)时没有权限表, 不同步
+    """
+    try:
+        model = apps.get_model("back", "AdminPermission")
+    except LookupError:
+        return
+    AdminPermission.sync_data(using=using, model=model)
@@ -40,11 +40,13 @@ def get_status(
     request: HttpRequest,
 ):
     redis_status = "False"
+    redis_pools = {}
     try:
-        from backend.settings import get_redis_connection
+        from backend.settings import get_redis_connection, redis_factory
 
         redis_conn = get_redis_connection()
         redis_status = str(redis_conn.ping())
+        redis_pools = redis_factory.stats()
     except Exception as e:
         logger.error(e)
         redis_status = repr(e)
@@ -84,6 +86,7 @@ def get_status(
         {
             "db": db_status,
             "redis": redis_status,
+            "redis_pools": redis_pools,
             "migrations": migrations_status,
         }
     )
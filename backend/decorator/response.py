@@ -1,18 +1,26 @@
+import enum
 import inspect
+import itertools
+import json
+import types
+from collections.abc import Callable, Iterator
 from functools import wraps
-from typing import ParamSpec, Protocol, TypeVar
+from typing import Annotated, Any, Literal, ParamSpec, Protocol, TypeVar, Union, get_args, get_origin
 
 from django.http import HttpRequest
-from django.http.response import JsonResponse
+from django.http.response import HttpResponse, StreamingHttpResponse
 from loguru import logger
 from ninja.operation import Operation
 from ninja.utils import contribute_operation_callback
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import PydanticSerializationError
 
-from backend.renderer import CustomJsonEncoder
+from backend.renderer import CustomJsonEncoder, orjson, orjson_dumps
+from backend.response import L, LStream
+from backend.utils.server_timing import server_timing
 
 P = ParamSpec("P")
-S = TypeVar("S", bound=BaseModel)
+S = TypeVar("S", bound=BaseModel | LStream)
 T = TypeVar("T", covariant=True)
 
 
@@ -27,20 +35,137 @@ class ViewFunc(Protocol[P, T]):
     ) -> T: ...
 
 
-def schema_response(func: ViewFunc[P, S]) -> ViewFunc[P, JsonResponse]:
+def stream_json(result: LStream, encoder: type[json.JSONEncoder] = CustomJsonEncoder) -> Iterator[bytes]:
+    """
+    按 L 的结构逐块输出 JSON
+
+    第一块输出前出错时直接抛出异常, 之后出错时响应头已发送, 记录日志并以 "error" 字段结束 JSON,
+    total 为出错前已读取的条数
+    """
+    dumps = encoder().encode
+    # data 之外的字段取自 L, 与非流式响应一致
+    trailer = L.ok([], code=result.code, msg=result.msg).model_dump(exclude={"data"})
+    head = dumps({"code": trailer.pop("code"), "msg": trailer.pop("msg")})
+    chunk = [head[:-1], ', "data": [']
+    total = 0
+    sent = False
+    error = None
+    try:
+        for item in result:
+            if total:
+                chunk.append(", ")
+            chunk.append(dumps(item))
+            total += 1
+            if total % result.chunk_size == 0:
+                yield "".join(chunk).encode()
+                sent = True
+                chunk.clear()
+    except Exception as e:
+        if not sent:
+            raise
+        logger.exception(f"Stream json failed: {e!r}")
+        error = "Internal Server Error"
+
+    trailer["total"] = total
+    if error is not None:
+        trailer["error"] = error
+    chunk.append("], ")
+    chunk.append(dumps(trailer)[1:])
+    yield "".join(chunk).encode()
+
+
+JSON_NATIVE_TYPES = (str, int, float, bool, type(None))
+
+
+def is_json_native(annotation: Any, seen: set[type] | None = None) -> bool:
+    """
+    类型的 pydantic JSON 序列化结果是否与 CustomJsonEncoder 一致
+    datetime, Decimal, FieldFile, Any 等由 CustomJsonEncoder 特殊处理的类型返回 False
+    """
+    if seen is None:
+        seen = set()
+    if annotation in JSON_NATIVE_TYPES or annotation is None:
+        return True
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Annotated:
+        return is_json_native(args[0], seen)
+    if origin is Literal:
+        return all(isinstance(i, JSON_NATIVE_TYPES) for i in args)
+    if origin in (list, tuple, set, frozenset, Union, types.UnionType):
+        return all(i is Ellipsis or is_json_native(i, seen) for i in args)
+    if origin is dict:
+        return args[:1] == (str,) and is_json_native(args[1], seen)
+    if origin is not None or not isinstance(annotation, type):
+        return False
+
+    if issubclass(annotation, enum.Enum):
+        return issubclass(annotation, str | int)
+    if issubclass(annotation, BaseModel):
+        if annotation in seen:
+            return True
+        seen.add(annotation)
+        return all(is_json_native(i.annotation, seen) for i in annotation.model_fields.values()) and all(
+            is_json_native(i.return_type, seen) for i in annotation.model_computed_fields.values()
+        )
+    return False
+
+
+def get_json_serializer(response: Any) -> Callable[[Any], bytes]:
+    """
+    根据响应类型生成序列化函数, 直接输出 bytes
+    纯 JSON 类型使用 pydantic 序列化, 其余使用 orjson + CustomJsonEncoder, 未安装 orjson 时使用 CustomJsonEncoder
+    """
+    if orjson is not None:
+        fallback = orjson_dumps
+    else:
+
+        def fallback(result: Any) -> bytes:
+            return json.dumps(result, cls=CustomJsonEncoder).encode()
+
+    if response is None or not is_json_native(response):
+        return fallback
+
+    adapter = TypeAdapter(response)
+
+    def serializer(result: Any) -> bytes:
+        if isinstance(result, BaseModel):
+            try:
+                return adapter.dump_json(result, warnings="error")
+            except PydanticSerializationError:
+                # 返回值与声明的类型不一致, 如 D[Schema] 返回 D.ok(dict)
+                pass
+        return fallback(result)
+
+    return serializer
+
+
+def schema_response(func: ViewFunc[P, S]) -> ViewFunc[P, HttpResponse | StreamingHttpResponse]:
     response = inspect.signature(func).return_annotation
     if response == inspect._empty:
         response = None
         logger.warning(f"View function `{func.__qualname__}` is missing a return type annotation.")
+    elif get_origin(response) is LStream:
+        response = L[get_args(response)[0]]  # type: ignore[valid-type]
 
     def callback(operation: Operation):
         operation.response_models = {200: operation._create_response_model(response)}
 
     contribute_operation_callback(func, callback)
+    serializer = get_json_serializer(response)
 
     @wraps(func)
-    def wrapper(*args, **kwargs) -> JsonResponse:
+    def wrapper(*args, **kwargs) -> HttpResponse | StreamingHttpResponse:
         result = func(*args, **kwargs)
-        return JsonResponse(result, safe=False, encoder=CustomJsonEncoder)
+        if isinstance(result, LStream):
+            # 在视图内读取第一块, 查询出错时由异常处理返回错误响应, 查询也计入请求的统计
+            chunks = stream_json(result)
+            with server_timing("serialize"):
+                first = next(chunks)
+            return StreamingHttpResponse(itertools.chain([first], chunks), content_type="application/json")
+        with server_timing("serialize"):
+            content = serializer(result)
+        return HttpResponse(content, content_type="application/json")
 
     return wrapper
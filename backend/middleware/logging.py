@@ -18,9 +18,17 @@ class ApiLoggingMiddleware(MiddlewareMixin):
             if not isinstance(data, dict):
                 data = {"__root__": data}
             return data
-        except Exception:
+        except (ValueError, RecursionError):
             return {}
 
+    @staticmethod
+    def _readable_json(content: bytes) -> str:
+        # 响应可能是 ensure_ascii 转义后的 JSON, 也可能是 UTF-8 编码的 JSON
+        try:
+            return json.dumps(json.loads(content), ensure_ascii=False)
+        except (ValueError, RecursionError):
+            return content.decode(errors="replace").replace("\n", " ")
+
     @staticmethod
     def _get_request_params(request: HttpRequest) -> dict:
         data = {}
@@ -42,8 +50,10 @@ class ApiLoggingMiddleware(MiddlewareMixin):
             logger.info(f"{request_content_type} {data}")
 
         response_content_type = response.headers.get("Content-Type", "")
-        if "application/json" in response_content_type and not request.path.endswith("openapi.json"):
-            logger.info("{} {}", response_content_type, response.content.decode("unicode_escape").replace("\n", " "))
+        if response.streaming:
+            logger.info(f"{response_content_type} {response}")
+        elif "application/json" in response_content_type and not request.path.endswith("openapi.json"):
+            logger.info("{} {}", response_content_type, ApiLoggingMiddleware._readable_json(response.content))
         elif "text/html" in response_content_type or "text/javascript" in response_content_type:
             logger.info(response_content_type)
         elif "utf-8" in response_content_type:
@@ -1,13 +1,23 @@
+import random
 import time
 from typing import NamedTuple
 
 from django.db.models.sql.compiler import SQLCompiler
+from loguru import logger
 
+from backend.settings import SERVER_TIMING_N_PLUS_ONE, SERVER_TIMING_SAMPLE_RATE, SERVER_TIMING_SLOW_QUERIES
 from backend.utils.query_logger import QueryLogger
+from backend.utils.redis_logger import RedisLogger
+from backend.utils.server_timing import ServerTiming
 
 original_execute_sql = SQLCompiler.execute_sql
 
 
+def quote_description(description: str, max_length: int = 200) -> str:
+    description = " ".join(description.split())[:max_length]
+    return description.replace("\\", "\\\\").replace('"', '\\"')
+
+
 class ServerTimingMetric(NamedTuple):
     name: str
     duration: float | None = None
@@ -17,31 +27,70 @@ class ServerTimingMetric(NamedTuple):
         if self.duration is None and self.description is None:
             return self.name
         if self.duration is None:
-            return f'{self.name};desc="{self.description}"'
+            return f'{self.name};desc="{quote_description(self.description)}"'
         if self.description is None:
             dur = self.duration * 1000
             return f"{self.name};dur={dur:.4f}"
         dur = self.duration * 1000
-        return f'{self.name};dur={dur:.4f};desc="{self.description}"'
+        return f'{self.name};dur={dur:.4f};desc="{quote_description(self.description)}"'
 
 
 class ServerTimingMiddleware:
-    def __init__(self, get_response):
+    """
+    添加 Server-Timing 响应头, 只统计SQL和redis命令的数量和耗时, 以及 server_timing 记录的 auth/serialize/render 等耗时
+
+    SERVER_TIMING_SAMPLE_RATE: 采样率 0~1, 未采样的请求不统计
+    SERVER_TIMING_SLOW_QUERIES: 记录最慢的N条SQL, 0为不记录
+    SERVER_TIMING_N_PLUS_ONE: 同一SQL指纹执行不少于N次时记录警告, 0为不检测, 检测时会记录每条SQL和调用位置
+    """
+
+    def __init__(
+        self,
+        get_response,
+        sample_rate: float | None = None,
+        slow_queries: int | None = None,
+        n_plus_one: int | None = None,
+    ):
         self.get_response = get_response
+        self.sample_rate = SERVER_TIMING_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.slow_queries = SERVER_TIMING_SLOW_QUERIES if slow_queries is None else slow_queries
+        self.n_plus_one = SERVER_TIMING_N_PLUS_ONE if n_plus_one is None else n_plus_one
 
     def __call__(self, request):
-        with QueryLogger().execute_wrapper() as ql:
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return self.get_response(request)
+
+        ql = QueryLogger(
+            record_queries=self.n_plus_one > 0, slow_queries=self.slow_queries, capture_stack=self.n_plus_one > 0
+        )
+        rl = RedisLogger(record_commands=False)
+        with ql.execute_wrapper(), rl.execute_wrapper(), ServerTiming().activate() as timing:
             start_time = time.perf_counter()
             response = self.get_response(request)
             end_time = time.perf_counter()
 
-        response_duration = end_time - start_time
-        db_duration = sum(i["duration"] for i in ql.queries)
-        db_query_count = len(ql.queries)
-
         server_timing_metrics = [
-            ServerTimingMetric(name="db", duration=db_duration, description=f"Database (count: {db_query_count})"),
-            ServerTimingMetric(name="resp", duration=response_duration, description="Response"),
+            ServerTimingMetric(name="db", duration=ql.duration, description=f"Database (count: {ql.count})"),
         ]
+        for i, (duration, sql) in enumerate(ql.slow_queries, 1):
+            server_timing_metrics.append(ServerTimingMetric(name=f"db-slow-{i}", duration=duration, description=sql))
+        if self.n_plus_one > 0:
+            for i, query in enumerate(ql.repeated_queries(self.n_plus_one), 1):
+                logger.warning(f"N+1 query in {request.method} {request.path}: {query}")
+                server_timing_metrics.append(
+                    ServerTimingMetric(name=f"db-repeated-{i}", duration=query.duration, description=str(query))
+                )
+        server_timing_metrics.append(
+            ServerTimingMetric(
+                name="redis", duration=rl.duration, description=f"Redis (count: {rl.count}, size: {rl.size})"
+            )
+        )
+        for name, (duration, count) in timing.metrics.items():
+            server_timing_metrics.append(
+                ServerTimingMetric(name=name, duration=duration, description=f"{name.title()} (count: {count})")
+            )
+        server_timing_metrics.append(
+            ServerTimingMetric(name="resp", duration=end_time - start_time, description="Response")
+        )
         response["Server-Timing"] = ", ".join(str(metric) for metric in server_timing_metrics)
         return response
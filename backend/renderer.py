@@ -1,37 +1,121 @@
 import datetime
 import decimal
-from collections.abc import Generator, Mapping
+import functools
+from collections.abc import Callable, Generator, Mapping
+from typing import Any, TypeVar
 
 from django.db import models
 from django.db.models.fields.files import FieldFile
+from django.http import HttpRequest
 from filebrowser.base import FileObject
 from loguru import logger
-from ninja.renderers import JSONRenderer
+from ninja.renderers import BaseRenderer, JSONRenderer
 from ninja.responses import NinjaJSONEncoder
+from pydantic import BaseModel
 
 from backend.settings import USE_TZ
+from backend.utils.server_timing import server_timing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+T = TypeVar("T")
+NOT_HANDLED: Any = object()
+
+
+@functools.singledispatch
+def json_default(o: Any) -> Any:
+    """
+    CustomJsonEncoder 的类型转换表, 未注册的类型返回 NOT_HANDLED, 通过 register_json_default 注册
+    """
+    return NOT_HANDLED
+
+
+# 具体类型 -> 转换函数, 避免每次调用 singledispatch 的 MRO 查找
+_json_default_dispatch: dict[type, Callable[[Any], Any]] = {}
+
+
+def register_json_default(func: Callable[[T], Any]) -> Callable[[T], Any]:
+    """
+    注册 CustomJsonEncoder 的类型转换函数, 按参数类型注解分派
+
+    >>> @register_json_default
+    >>> def _(o: ipaddress.IPv4Address):
+    >>>     return str(o)
+    """
+    json_default.register(func)
+    _json_default_dispatch.clear()
+    return func
+
+
+def dispatch_json_default(o: Any) -> Any:
+    cls = o.__class__
+    func = _json_default_dispatch.get(cls)
+    if func is None:
+        func = json_default.dispatch(cls)
+        _json_default_dispatch[cls] = func
+    return func(o)
+
+
+@register_json_default
+def _(o: FieldFile):
+    return o.url
+
+
+@register_json_default
+def _(o: FileObject):
+    return o.url
+
+
+@register_json_default
+def _(o: models.Model):
+    return str(o)
+
+
+@register_json_default
+def _(o: decimal.Decimal):
+    return f"{o:f}"
+
+
+if not USE_TZ:
+
+    @register_json_default
+    def _(o: datetime.datetime):
+        return o.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@register_json_default
+def _(o: dict):
+    return o
+
+
+@register_json_default
+def _(o: Mapping):
+    return dict(o)
+
+
+@register_json_default
+def _(o: str):
+    return o
+
+
+@register_json_default
+def _(o: Generator):
+    return list(o)
+
+
+@register_json_default
+def _(o: BaseModel):
+    return o.model_dump()
 
 
 class CustomJsonEncoder(NinjaJSONEncoder):
     def default(self, o):
-        if isinstance(o, FieldFile):
-            return o.url
-        if isinstance(o, FileObject):
-            return o.url
-        if isinstance(o, models.Model):
-            return str(o)
-        if isinstance(o, decimal.Decimal):
-            return f"{o:f}"
-        if not USE_TZ and isinstance(o, datetime.datetime):
-            return o.strftime("%Y-%m-%d %H:%M:%S")
-        if isinstance(o, dict):
-            return o
-        if isinstance(o, Mapping):
-            return dict(o)
-        if isinstance(o, str):
-            return o
-        if isinstance(o, Generator):
-            return list(o)
+        result = dispatch_json_default(o)
+        if result is not NOT_HANDLED:
+            return result
         try:
             return super().default(o)
         except TypeError:
@@ -41,3 +125,36 @@ class CustomJsonEncoder(NinjaJSONEncoder):
 
 class CustomJSONRenderer(JSONRenderer):
     encoder_class = CustomJsonEncoder
+
+    def render(self, request: HttpRequest, data: Any, *, response_status: int) -> Any:
+        with server_timing("render"):
+            return super().render(request, data, response_status=response_status)
+
+
+_custom_json_encoder = CustomJsonEncoder()
+
+
+def orjson_dumps(data: Any) -> bytes:
+    """与 CustomJsonEncoder 输出一致的 orjson 序列化, 不转义非 ASCII 字符"""
+    if orjson is None:
+        raise RuntimeError("orjson is not installed")
+    return orjson.dumps(
+        data,
+        default=_custom_json_encoder.default,
+        # datetime 交给 default 处理, 与 CustomJsonEncoder 的格式一致
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    orjson 渲染器, 需要安装 orjson
+
+    renderer = ORJSONRenderer() if orjson else CustomJSONRenderer()
+    """
+
+    media_type = "application/json"
+
+    def render(self, request: HttpRequest, data: Any, *, response_status: int) -> Any:
+        with server_timing("render"):
+            return orjson_dumps(data)
@@ -1,15 +1,110 @@
 from __future__ import annotations
 
-from collections.abc import Mapping
-from typing import Generic, TypeVar
-
-from django.core.paginator import Page, Paginator
+import base64
+import math
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from typing import Any, Generic, TypeVar
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Model, QuerySet
 from ninja import Field, Schema
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+
+from backend.utils.paginator import count_cache
 
 DataType = Mapping | BaseModel
 T = TypeVar("T")
 U = TypeVar("U")
+TModel = TypeVar("TModel", bound=Model)
+
+
+class CursorSchema(Schema):
+    """游标分页token内容"""
+
+    value: int | str = Field(..., description="上一页最后一行排序字段的值")
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.model_dump_json().encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, cursor: str) -> CursorSchema:
+        try:
+            data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            return cls.model_validate_json(data)
+        except (ValueError, ValidationError):
+            raise InvalidPage("无效的游标")
+
+
+class CursorPage(Generic[TModel]):
+    def __init__(self, object_list: list[TModel], next_cursor: str | None, paginator: CursorPaginator[TModel]):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.paginator = paginator
+
+    def __repr__(self) -> str:
+        return f"<CursorPage next_cursor={self.next_cursor!r}>"
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __iter__(self) -> Iterator[TModel]:
+        return iter(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+class CursorPaginator(Generic[TModel]):
+    """
+    游标(keyset)分页, 按唯一且有索引的字段排序, 不使用 OFFSET, 翻页耗时与页码无关
+
+    object_list: 查询集
+    per_page: 每页数量
+    ordering: 排序字段, 如 "-id", 字段值必须唯一且不为空, 非 int/str 的值(如时间)在游标中保存为字符串
+    """
+
+    def __init__(self, object_list: QuerySet[TModel], per_page: int, ordering: str = "-id"):
+        if per_page < 1:
+            raise InvalidPage("每页数量必须大于0")
+        self.object_list = object_list
+        self.per_page = per_page
+        self.ordering = ordering
+        self.descending = ordering.startswith("-")
+        self.field_name = ordering.removeprefix("-")
+        opts = object_list.model._meta
+        self.field = opts.pk if self.field_name == "pk" else opts.get_field(self.field_name)
+
+    def get_cursor(self, obj: TModel) -> str:
+        value = getattr(obj, self.field.attname)
+        if not isinstance(value, int | str):
+            value = self.field.value_to_string(obj)
+        return CursorSchema(value=value).encode()
+
+    def get_cursor_value(self, cursor: str) -> Any:
+        value = CursorSchema.decode(cursor).value
+        try:
+            return self.field.to_python(value)
+        except DjangoValidationError:
+            raise InvalidPage("无效的游标")
+
+    def count(self, estimate_threshold: int | None = None) -> int:
+        """总数, 使用 CountCache 缓存, 按需调用"""
+        return count_cache.count(self.object_list, estimate_threshold=estimate_threshold)
+
+    def page(self, cursor: str | None = None) -> CursorPage[TModel]:
+        queryset = self.object_list.order_by(self.ordering)
+        if cursor:
+            value = self.get_cursor_value(cursor)
+            lookup = "lt" if self.descending else "gt"
+            queryset = queryset.filter(**{f"{self.field_name}__{lookup}": value})
+
+        object_list = list(queryset[: self.per_page + 1])
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[: self.per_page]
+            next_cursor = self.get_cursor(object_list[-1])
+        return CursorPage(object_list, next_cursor=next_cursor, paginator=self)
 
 
 class D(Schema, Generic[T]):
@@ -26,12 +121,45 @@ class D(Schema, Generic[T]):
         return D(code=200, msg=msg, data=None)
 
 
+class LStream(Generic[T]):
+    """
+    流式列表响应, 由 schema_response 转换为 StreamingHttpResponse, 逐条序列化不保留完整响应体
+
+    iterable: 数据, QuerySet 使用 iterator(chunk_size) 迭代
+    schema: 每条数据的转换函数, 如 ModelSchema.from_orm
+    chunk_size: 每次从数据库读取以及每次输出的条数
+    """
+
+    def __init__(
+        self,
+        iterable: Iterable[Any],
+        schema: Callable[[Any], T] | None = None,
+        chunk_size: int = 1000,
+        code: int = 200,
+        msg: str = "OK",
+    ):
+        self.iterable = iterable
+        self.schema = schema
+        self.chunk_size = chunk_size
+        self.code = code
+        self.msg = msg
+
+    def __iter__(self) -> Iterator[T]:
+        iterable = self.iterable
+        if isinstance(iterable, QuerySet):
+            iterable = iterable.iterator(chunk_size=self.chunk_size)
+        if self.schema is None:
+            return iter(iterable)
+        return map(self.schema, iterable)
+
+
 class L(Schema, Generic[T]):
     code: int = Field(..., examples=[200])
     msg: str = Field(..., examples=["OK"])
     data: list[T]
     total: int = Field(..., examples=[10])
     total_page: int = Field(..., examples=[1])
+    next_cursor: str | None = Field(None, examples=[None], description="下一页游标, 仅游标分页, 为空表示没有下一页")
 
     @staticmethod
     def ok(data: list[U], code: int = 200, msg: str = "OK", total: int | None = None, total_page: int = 1) -> L[U]:
@@ -45,6 +173,37 @@ class L(Schema, Generic[T]):
             page = page.paginator
         return L[U](code=code, msg=msg, data=data, total=page.count, total_page=page.num_pages)
 
+    @staticmethod
+    def stream(
+        iterable: Iterable[Any],
+        schema: Callable[[Any], U] | None = None,
+        chunk_size: int = 1000,
+        code: int = 200,
+        msg: str = "OK",
+    ) -> LStream[U]:
+        """
+        流式输出全部数据, 仅用于 schema_response 装饰的视图, total 为实际输出条数
+
+        视图返回类型标注为 LStream[Schema], 文档中的响应结构为 L[Schema]
+        """
+        return LStream(iterable, schema=schema, chunk_size=chunk_size, code=code, msg=msg)
+
+    @staticmethod
+    def cursor(
+        data: list[U],
+        page: CursorPage,
+        total: int | None = None,
+        code: int = 200,
+        msg: str = "OK",
+    ) -> L[U]:
+        """游标分页, total 为空时不统计总数, total 和 total_page 返回 -1"""
+        total_page = -1
+        if total is None:
+            total = -1
+        else:
+            total_page = math.ceil(total / page.paginator.per_page)
+        return L[U](code=code, msg=msg, data=data, total=total, total_page=total_page, next_cursor=page.next_cursor)
+
 
 class Response:
     @classmethod
@@ -1,7 +1,7 @@
 from backend.apps.back.models import AdminUser
 from backend.apps.user.models import User
-from backend.security.auth import AuthBearerToken
-from backend.settings import get_redis_connection
+from backend.security.auth import AsyncAuthBearerToken, AuthBearerToken
+from backend.settings import get_async_redis_connection, get_redis_connection
 
 redis_conn = get_redis_connection()
 
@@ -11,6 +11,8 @@ auth_admin = AuthBearerToken(
     user_model=AdminUser,
     expires=12 * 60 * 60,
     redis_conn=redis_conn,
+    select_related=("role",),
+    prefetch_related=("role__permission",),
 )
 
 # 前端登录验证
@@ -19,3 +21,12 @@ auth = AuthBearerToken(
     expires=30 * 24 * 60 * 60,
     redis_conn=redis_conn,
 )
+
+# 后台登录验证, 用于 async 视图, 与 auth_admin 共用token
+auth_admin_async = AsyncAuthBearerToken(
+    user_model=AdminUser,
+    expires=auth_admin.expires,
+    redis_conn=get_async_redis_connection,
+    select_related=("role",),
+    prefetch_related=("role__permission",),
+)
@@ -1,6 +1,9 @@
+import hashlib
+import inspect
+import threading
 import time
 import uuid
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from typing import Generic, TypeVar
 
 import jwt
@@ -12,12 +15,37 @@ from ninja.errors import AuthenticationError
 from ninja.security import APIKeyHeader, HttpBearer
 from pydantic import BaseModel, Field
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import NoScriptError, RedisError
 
 from backend.settings import REDIS_PREFIX, SECRET_KEY
+from backend.utils.cache import TTLCache
+from backend.utils.server_timing import server_timing
 
 TUser = TypeVar("TUser", bound=Model)
 TToken = TypeVar("TToken", bound=BaseModel)
 
+REQUEST_USER_CACHE_ATTR = "_login_user_cache"
+
+# token 与缓存一致时续期, 返回 1, 否则返回 0
+CHECK_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+CHECK_RENEW_SHA = hashlib.sha1(CHECK_RENEW_SCRIPT.encode()).hexdigest()
+
+
+def get_request_user_cache(request: HttpRequest) -> dict[object, tuple[int | str, Model | None]]:
+    """请求内的登录用户缓存, 以认证实例为键, 值为 (uid, user)"""
+    cache = getattr(request, REQUEST_USER_CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(request, REQUEST_USER_CACHE_ATTR, cache)
+    return cache
+
 
 class JwtModel(BaseModel):
     iat: int
@@ -35,28 +63,54 @@ class JwtModel(BaseModel):
         )
 
 
+class RevocableJwtModel(JwtModel):
+    jti: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    # 毫秒签发时间, iat 只到秒, 同一秒内注销后重新登录的 token 需要区分
+    iat_ms: int | None = None
+
+    @classmethod
+    def new(cls, uid: int | str, expires: int):
+        iat_ms = int(time.time() * 1000)
+        iat = iat_ms // 1000
+        return cls(
+            uid=uid,
+            iat=iat,
+            exp=iat + expires,
+            iat_ms=iat_ms,
+        )
+
+
 class AuthJwt(HttpBearer, Generic[TUser]):
+    token_model: type[JwtModel] = JwtModel
+
     def __init__(
         self,
         expires: int,
         user_model: type[TUser],
         uid_field: str = "id",
         secret_key: str = SECRET_KEY,
+        select_related: Sequence[str] = (),
+        prefetch_related: Sequence[str] = (),
     ):
         """
         user_model: 用户模型
         expires: 缓存token的过期时间(秒)
         secret_key: jwt加密的密钥
+        select_related: 查询登录用户时 select_related 的字段
+        prefetch_related: 查询登录用户时 prefetch_related 的字段
         """
         self.user_model = user_model
         self.uid_field = uid_field
         self.expires = expires
         self.secret_key = secret_key
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
         super().__init__()
 
     def __call__(self, request: HttpRequest):
         # 返回的值保存在request.auth
-        auth = super().__call__(request)
+        with server_timing("auth"):
+            auth = super().__call__(request)
         return auth
 
     def authenticate(self, request: HttpRequest, token: str):
@@ -77,11 +131,23 @@ class AuthJwt(HttpBearer, Generic[TUser]):
         uid = self.get_login_uid_optional(request)
         if uid is None:
             return None
-        user = self.user_model._default_manager.filter(
+
+        cache = get_request_user_cache(request)
+        cached = cache.get(self)
+        if cached is not None and cached[0] == uid:
+            return cached[1]  # type: ignore
+
+        queryset = self.user_model._default_manager.filter(
             **{
                 self.uid_field: uid,
             }
-        ).first()
+        )
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        user = queryset.first()
+        cache[self] = (uid, user)
         return user
 
     def get_login_uid(self, request: HttpRequest) -> int | str:
@@ -100,7 +166,7 @@ class AuthJwt(HttpBearer, Generic[TUser]):
 
     def generate_token(self, uid: int | str) -> str:
         """生成token"""
-        model = JwtModel.new(uid=uid, expires=self.expires)
+        model = self.token_model.new(uid=uid, expires=self.expires)
         payload = model.model_dump()
         token = jwt.encode(payload, self.secret_key, algorithm="HS256")
         return token
@@ -109,73 +175,335 @@ class AuthJwt(HttpBearer, Generic[TUser]):
         """解析token"""
         try:
             data: dict = jwt.decode(token, self.secret_key, algorithms=["HS256"])
-            return JwtModel.model_validate(data)
+            return self.token_model.model_validate(data)
         except Exception as e:
             logger.warning(f"Invalid token: {e}")
             raise AuthenticationError(message="Invalid token")
 
 
+class AuthRevocableJwt(AuthJwt[TUser]):
+    """
+    可注销的 jwt 认证, 本地校验 jwt 签名和过期时间, 注销记录从 redis 定期同步到进程内
+
+    redis 中保存未过期的已注销 jti(有序集合, 分数为 token 过期时间) 和 uid 的毫秒注销时间(有序集合, 早于 expires
+    秒前的记录在注销时删除), 另有一个版本号,
+    每 sync_interval 秒由一个请求读取一次版本号, 有变化时才拉取注销记录, 其余请求不访问 redis
+
+    其他进程注销的 token 最长在 sync_interval 秒后失效, redis 不可用时沿用上次同步的注销记录
+    """
+
+    token_model = RevocableJwtModel
+
+    def __init__(
+        self,
+        redis_conn: "Redis[str]",
+        expires: int,
+        user_model: type[TUser],
+        uid_field: str = "id",
+        secret_key: str = SECRET_KEY,
+        revoke_prefix: str | None = None,
+        sync_interval: float = 5,
+        select_related: Sequence[str] = (),
+        prefetch_related: Sequence[str] = (),
+    ):
+        """
+        redis_conn: redis连接
+        revoke_prefix: redis中注销记录的key前缀
+        sync_interval: 同步注销记录的间隔(秒), 即其他进程注销后token最长仍可用的时间
+        """
+        super().__init__(
+            expires=expires,
+            user_model=user_model,
+            uid_field=uid_field,
+            secret_key=secret_key,
+            select_related=select_related,
+            prefetch_related=prefetch_related,
+        )
+        if revoke_prefix is None:
+            revoke_prefix = f"{REDIS_PREFIX}:{user_model.__name__}:jwt:"
+        revoke_prefix = revoke_prefix.removesuffix(":")
+        self.redis_conn = redis_conn
+        self.revoked_key = f"{revoke_prefix}:revoked"
+        self.not_before_key = f"{revoke_prefix}:not_before_ms"
+        self.version_key = f"{revoke_prefix}:version"
+        self.sync_interval = sync_interval
+        # 已注销的 jti
+        self.revoked: frozenset[str] = frozenset()
+        # uid -> 毫秒注销时间, 签发时间不晚于该时间的 token 无效
+        self.not_before: dict[str, int] = {}
+        self.version: str | None = None
+        self.next_sync = 0.0
+        self._sync_lock = threading.Lock()
+
+    def authenticate(self, request: HttpRequest, token: str):
+        data = self.decode_token(token)
+        self.sync()
+        if self.is_revoked(data):
+            return None
+        return data.uid
+
+    def is_revoked(self, data: JwtModel) -> bool:
+        if getattr(data, "jti", None) in self.revoked:
+            return True
+        not_before = self.not_before.get(str(data.uid))
+        if not_before is None:
+            return False
+        iat_ms = getattr(data, "iat_ms", None)
+        if iat_ms is None:
+            # 没有毫秒签发时间的 token 按该秒的最后一毫秒签发处理
+            iat_ms = data.iat * 1000 + 999
+        return iat_ms <= not_before
+
+    def get_not_before_min(self) -> int:
+        """早于该毫秒时间的注销记录已无意义, 之前签发的 token 均已过期"""
+        return int(time.time() * 1000) - self.expires * 1000
+
+    def sync(self, force: bool = False):
+        """
+        从 redis 同步注销记录, 未到同步时间或其他线程正在同步时直接返回
+
+        force: 忽略同步间隔和版本号, 重新拉取
+        """
+        now = time.monotonic()
+        if not force and now < self.next_sync:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self.next_sync = now + self.sync_interval
+            if not force and self.redis_conn.get(self.version_key) == self.version:
+                return
+            pipe = self.redis_conn.pipeline()
+            pipe.get(self.version_key)
+            pipe.zrangebyscore(self.revoked_key, int(time.time()), "+inf")
+            pipe.zrangebyscore(self.not_before_key, self.get_not_before_min(), "+inf", withscores=True)
+            version, revoked, not_before = pipe.execute()
+            self.revoked = frozenset(revoked)
+            self.not_before = {k: int(v) for k, v in not_before}
+            self.version = version
+        except RedisError as e:
+            logger.warning(f"Sync revoked jwt failed: {e}")
+        finally:
+            self._sync_lock.release()
+
+    def revoke_token(self, token: str):
+        """注销单个token, 如登出"""
+        data = self.decode_token(token)
+        jti = getattr(data, "jti", None)
+        if jti is None:
+            raise AuthenticationError(message="Token can not be revoked")
+        pipe = self.redis_conn.pipeline()
+        pipe.zadd(self.revoked_key, {jti: data.exp})
+        pipe.zremrangebyscore(self.revoked_key, "-inf", f"({int(time.time())}")
+        pipe.expire(self.revoked_key, self.expires)
+        pipe.incr(self.version_key)
+        pipe.execute()
+        self.revoked = self.revoked | {jti}
+
+    def revoke_uids(self, uids: Iterable[int | str]):
+        """注销这些uid当前已签发的全部token, 如修改密码或角色权限变更"""
+        mapping = dict.fromkeys((str(uid) for uid in uids), int(time.time() * 1000))
+        if not mapping:
+            return
+        not_before_min = self.get_not_before_min()
+        pipe = self.redis_conn.pipeline()
+        pipe.zadd(self.not_before_key, mapping)
+        pipe.zremrangebyscore(self.not_before_key, "-inf", f"({not_before_min}")
+        pipe.incr(self.version_key)
+        pipe.execute()
+        not_before = {**self.not_before, **mapping}
+        self.not_before = {k: v for k, v in not_before.items() if v >= not_before_min}
+
+
 class BearerTokenModel(BaseModel):
     iat: int = Field(default_factory=lambda: int(time.time()))
     uid: int | str
 
 
-class AuthBearerToken(HttpBearer, Generic[TUser]):
+class BearerTokenBase(HttpBearer, Generic[TUser]):
+    """
+    AuthBearerToken 和 AsyncAuthBearerToken 共用的 token 生成, 解析, redis key 和进程内缓存, 不访问 redis
+    """
+
     def __init__(
         self,
-        redis_conn: "Redis[str]",
         expires: int,
         user_model: type[TUser],
         cache_token_prefix: str | None = None,
         secret_key: str = SECRET_KEY,
+        verify_cache_size: int = 1024,
+        verify_cache_ttl: float = 10,
+        renew_interval: int | None = None,
+        select_related: Sequence[str] = (),
+        prefetch_related: Sequence[str] = (),
     ):
         """
-        redis_conn: redis连接
         expires: token的过期时间(秒)
         user_model: 用户模型
         cache_token_prefix: 缓存token的前缀
         secret_key: jwt加密的密钥
-        after_login_hook: 登录成功后执行的回调函数
+        verify_cache_size: 进程内token校验缓存数量, 0为不缓存
+        verify_cache_ttl: 进程内token校验缓存时间(秒), 即其他进程登出/重新登录后旧token最长仍可用的时间
+        renew_interval: token续期间隔(秒), 默认为过期时间的1/10, 剩余有效期低于 expires - renew_interval 时才续期
+        select_related: 查询登录用户时 select_related 的字段
+        prefetch_related: 查询登录用户时 prefetch_related 的字段
         """
         self.user_model = user_model
         if cache_token_prefix is None:
             cache_token_prefix = f"{REDIS_PREFIX}:{user_model.__name__}:token:"
         cache_token_prefix = cache_token_prefix.removesuffix(":")
 
-        self.redis_conn = redis_conn
         self.expires = expires
         self.cache_token_prefix = cache_token_prefix
         self.secret_key = secret_key
+        if renew_interval is None:
+            renew_interval = expires // 10
+        self.renew_interval = renew_interval
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+        # token -> uid, 已通过redis校验的token
+        self.verify_cache: TTLCache[str, int | str] = TTLCache(maxsize=verify_cache_size, ttl=verify_cache_ttl)
+        # token -> uid, 续期间隔内已续期的token
+        self.renew_cache: TTLCache[str, int | str] = TTLCache(maxsize=verify_cache_size, ttl=renew_interval)
         super().__init__()
 
+    def get_token_key(self, uid: int | str) -> str:
+        return f"{self.cache_token_prefix}:{uid}"
+
+    def get_token_keys(self, uids: Sequence[int | str], batch_size: int) -> Iterator[list[str]]:
+        """按 batch_size 分批的 redis key"""
+        for i in range(0, len(uids), batch_size):
+            yield [self.get_token_key(uid) for uid in uids[i : i + batch_size]]
+
+    def clear_cache(self, *uids: int | str):
+        """清除本进程内这些uid的token缓存"""
+        uid_set = set(uids)
+        self.verify_cache.discard_if(lambda _, v: v in uid_set)
+        self.renew_cache.discard_if(lambda _, v: v in uid_set)
+
+    def get_user_queryset(self, uid: int | str) -> "models.QuerySet[TUser]":
+        queryset = self.user_model._default_manager.filter(pk=uid)
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+    def encode_token(self, uid: int | str) -> str:
+        """生成token, 不写入redis"""
+        payload = BearerTokenModel(uid=uid).model_dump()
+        return jwt.encode(payload, self.secret_key, algorithm="HS256")
+
+    def decode_token(self, token: str):
+        """解析token"""
+        try:
+            data: dict = jwt.decode(token, self.secret_key, algorithms=["HS256"])
+            return BearerTokenModel.model_validate(data)
+        except Exception as e:
+            logger.warning(f"Invalid token: {e}")
+            raise AuthenticationError(message="Invalid token")
+
+
+class AuthBearerToken(BearerTokenBase[TUser]):
+    def __init__(
+        self,
+        redis_conn: "Redis[str]",
+        expires: int,
+        user_model: type[TUser],
+        cache_token_prefix: str | None = None,
+        secret_key: str = SECRET_KEY,
+        verify_cache_size: int = 1024,
+        verify_cache_ttl: float = 10,
+        renew_interval: int | None = None,
+        select_related: Sequence[str] = (),
+        prefetch_related: Sequence[str] = (),
+    ):
+        """
+        redis_conn: redis连接
+        其他参数见 BearerTokenBase
+        """
+        self.redis_conn = redis_conn
+        super().__init__(
+            expires=expires,
+            user_model=user_model,
+            cache_token_prefix=cache_token_prefix,
+            secret_key=secret_key,
+            verify_cache_size=verify_cache_size,
+            verify_cache_ttl=verify_cache_ttl,
+            renew_interval=renew_interval,
+            select_related=select_related,
+            prefetch_related=prefetch_related,
+        )
+
     def __call__(self, request: HttpRequest):
         # 返回的值保存在request.auth
-        auth = super().__call__(request)
+        with server_timing("auth"):
+            auth = super().__call__(request)
         return auth
 
     def authenticate(self, request: HttpRequest, token: str):
-        uid = self.decode_token(token).uid
-        if self.token_check(uid, token):
-            # 续期
-            self.set_token(uid, token)
+        uid = self.verify_cache.get(token)
+        if uid is not None:
             return uid
-        else:
+
+        uid = self.decode_token(token).uid
+        # 续期间隔内未续期时, 检查和续期在一次脚本调用中完成
+        renew = token not in self.renew_cache
+        if not self.token_check(uid, token, renew=renew):
             return None
 
+        self.verify_cache.set(token, uid)
+        if renew:
+            self.renew_cache.set(token, uid)
+        return uid
+
     def set_token(self, uid: int | str, token: str):
         """设置token"""
-        key = f"{self.cache_token_prefix}:{uid}"
-        self.redis_conn.set(name=key, value=token, ex=self.expires)
+        self.redis_conn.set(name=self.get_token_key(uid), value=token, ex=self.expires)
+        self.renew_cache.set(token, uid)
 
     def get_token(self, uid: int | str) -> str | None:
         """获取token"""
-        key = f"{self.cache_token_prefix}:{uid}"
-        token = self.redis_conn.get(key)
+        token = self.redis_conn.get(self.get_token_key(uid))
         return token
 
-    def token_check(self, uid: int | str, token: str):
-        """检查token"""
-        return self.get_token(uid) == token
+    def token_check(self, uid: int | str, token: str, renew: bool = False):
+        """
+        检查token
+
+        renew: token有效时重置过期时间, 检查和续期为一次原子操作
+        """
+        if not renew:
+            return self.get_token(uid) == token
+        args = (1, self.get_token_key(uid), token, self.expires)
+        try:
+            result = self.redis_conn.evalsha(CHECK_RENEW_SHA, *args)
+        except NoScriptError:
+            result = self.redis_conn.eval(CHECK_RENEW_SCRIPT, *args)
+        return result == 1
+
+    def get_tokens(self, uids: Iterable[int | str], batch_size: int = 1000) -> dict[int | str, str | None]:
+        """批量获取token, 每批一次 MGET"""
+        uids = list(uids)
+        tokens: list[str | None] = []
+        for keys in self.get_token_keys(uids, batch_size):
+            tokens.extend(self.redis_conn.mget(keys))
+        return dict(zip(uids, tokens))
+
+    def revoke_tokens(self, uids: Iterable[int | str], batch_size: int = 1000) -> int:
+        """
+        批量注销token, 每批一条 UNLINK, 所有批次在一个 pipeline 中发送, 返回删除的数量
+
+        其他进程的进程内缓存在 verify_cache_ttl 内过期
+        """
+        uids = list(uids)
+        if not uids:
+            return 0
+        self.clear_cache(*uids)
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for keys in self.get_token_keys(uids, batch_size):
+            pipe.unlink(*keys)
+        return sum(pipe.execute())
 
     def get_login_uid_optional(self, request: HttpRequest) -> int | str | None:
         """可选获取登录用户uid, 未登录返回 None"""
@@ -191,7 +519,14 @@ class AuthBearerToken(HttpBearer, Generic[TUser]):
         uid = self.get_login_uid_optional(request)
         if uid is None:
             return None
-        user = self.user_model._default_manager.filter(pk=uid).first()
+
+        cache = get_request_user_cache(request)
+        cached = cache.get(self)
+        if cached is not None and cached[0] == uid:
+            return cached[1]  # type: ignore
+
+        user = self.get_user_queryset(uid).first()
+        cache[self] = (uid, user)
         return user
 
     def get_login_uid(self, request: HttpRequest) -> int | str:
@@ -210,19 +545,160 @@ class AuthBearerToken(HttpBearer, Generic[TUser]):
 
     def generate_token(self, uid: int | str) -> str:
         """生成token"""
-        payload = BearerTokenModel(uid=uid).model_dump()
-        token = jwt.encode(payload, self.secret_key, algorithm="HS256")
+        token = self.encode_token(uid)
+        self.clear_cache(uid)
         self.set_token(uid, token)
         return token
 
-    def decode_token(self, token: str):
-        """解析token"""
+
+class AsyncAuthBearerToken(BearerTokenBase[TUser]):
+    """
+    AuthBearerToken 的异步版本, 用于 async 视图, token 格式和 redis key 与 AuthBearerToken 相同
+
+    redis_conn: redis.asyncio 连接, 或返回连接的函数(如 get_async_redis_connection, 每个事件循环一个连接)
+    其他参数见 BearerTokenBase
+    """
+
+    def __init__(
+        self,
+        redis_conn: "AsyncRedis[str] | Callable[[], AsyncRedis[str]]",
+        expires: int,
+        user_model: type[TUser],
+        cache_token_prefix: str | None = None,
+        secret_key: str = SECRET_KEY,
+        verify_cache_size: int = 1024,
+        verify_cache_ttl: float = 10,
+        renew_interval: int | None = None,
+        select_related: Sequence[str] = (),
+        prefetch_related: Sequence[str] = (),
+    ):
+        self.redis_conn = redis_conn
+        super().__init__(
+            expires=expires,
+            user_model=user_model,
+            cache_token_prefix=cache_token_prefix,
+            secret_key=secret_key,
+            verify_cache_size=verify_cache_size,
+            verify_cache_ttl=verify_cache_ttl,
+            renew_interval=renew_interval,
+            select_related=select_related,
+            prefetch_related=prefetch_related,
+        )
+
+    def get_redis(self) -> "AsyncRedis[str]":
+        if callable(self.redis_conn):
+            return self.redis_conn()
+        return self.redis_conn
+
+    async def authenticate(self, request: HttpRequest, token: str):
+        # HttpBearer.__call__ 返回该协程, 由 ninja await, 返回的值保存在request.auth
+        with server_timing("auth"):
+            uid = self.verify_cache.get(token)
+            if uid is not None:
+                return uid
+
+            uid = self.decode_token(token).uid
+            renew = token not in self.renew_cache
+            if not await self.token_check(uid, token, renew=renew):
+                return None
+
+            self.verify_cache.set(token, uid)
+            if renew:
+                self.renew_cache.set(token, uid)
+            return uid
+
+    async def set_token(self, uid: int | str, token: str):
+        """设置token"""
+        await self.get_redis().set(name=self.get_token_key(uid), value=token, ex=self.expires)
+        self.renew_cache.set(token, uid)
+
+    async def get_token(self, uid: int | str) -> str | None:
+        """获取token"""
+        token = await self.get_redis().get(self.get_token_key(uid))
+        return token
+
+    async def token_check(self, uid: int | str, token: str, renew: bool = False):
+        """
+        检查token
+
+        renew: token有效时重置过期时间, 检查和续期为一次原子操作
+        """
+        if not renew:
+            return await self.get_token(uid) == token
+        redis_conn = self.get_redis()
+        args = (1, self.get_token_key(uid), token, self.expires)
         try:
-            data: dict = jwt.decode(token, self.secret_key, algorithms=["HS256"])
-            return BearerTokenModel.model_validate(data)
-        except Exception as e:
-            logger.warning(f"Invalid token: {e}")
-            raise AuthenticationError(message="Invalid token")
+            result = await redis_conn.evalsha(CHECK_RENEW_SHA, *args)
+        except NoScriptError:
+            result = await redis_conn.eval(CHECK_RENEW_SCRIPT, *args)
+        return result == 1
+
+    async def get_tokens(self, uids: Iterable[int | str], batch_size: int = 1000) -> dict[int | str, str | None]:
+        """批量获取token, 每批一次 MGET"""
+        uids = list(uids)
+        redis_conn = self.get_redis()
+        tokens: list[str | None] = []
+        for keys in self.get_token_keys(uids, batch_size):
+            tokens.extend(await redis_conn.mget(keys))
+        return dict(zip(uids, tokens))
+
+    async def revoke_tokens(self, uids: Iterable[int | str], batch_size: int = 1000) -> int:
+        """批量注销token, 每批一条 UNLINK, 所有批次在一个 pipeline 中发送, 返回删除的数量"""
+        uids = list(uids)
+        if not uids:
+            return 0
+        self.clear_cache(*uids)
+        pipe = self.get_redis().pipeline(transaction=False)
+        for keys in self.get_token_keys(uids, batch_size):
+            pipe.unlink(*keys)
+        return sum(await pipe.execute())
+
+    async def get_login_uid_optional(self, request: HttpRequest) -> int | str | None:
+        """可选获取登录用户uid, 未登录返回 None"""
+        auth = None
+        if hasattr(request, "auth"):
+            auth = getattr(request, "auth")
+        else:
+            auth = self(request)
+            if inspect.isawaitable(auth):
+                auth = await auth
+        return auth
+
+    async def get_login_user_optional(self, request: HttpRequest) -> TUser | None:
+        """可选获取登录用户, 未登录返回 None"""
+        uid = await self.get_login_uid_optional(request)
+        if uid is None:
+            return None
+
+        cache = get_request_user_cache(request)
+        cached = cache.get(self)
+        if cached is not None and cached[0] == uid:
+            return cached[1]  # type: ignore
+
+        user = await self.get_user_queryset(uid).afirst()
+        cache[self] = (uid, user)
+        return user
+
+    async def get_login_uid(self, request: HttpRequest) -> int | str:
+        """获取登录用户uid"""
+        uid = await self.get_login_uid_optional(request)
+        if not uid:
+            raise AuthenticationError(message="Uid not found")
+        return uid
+
+    async def get_login_user(self, request: HttpRequest) -> TUser:
+        """获取登录用户"""
+        user = await self.get_login_user_optional(request)
+        if not user:
+            raise AuthenticationError(message="User not found")
+        return user
+
+    async def generate_token(self, uid: int | str) -> str:
+        """生成token"""
+        token = self.encode_token(uid)
+        self.clear_cache(uid)
+        await self.set_token(uid, token)
+        return token
 
 
 class AuthBearerTokenDatabase(APIKeyHeader, Generic[TUser]):
@@ -244,7 +720,8 @@ class AuthBearerTokenDatabase(APIKeyHeader, Generic[TUser]):
 
     def __call__(self, request: HttpRequest) -> TUser | None:
         # 返回的值保存在request.auth
-        auth = super().__call__(request)
+        with server_timing("auth"):
+            auth = super().__call__(request)
         return auth
 
     def authenticate(self, request: HttpRequest, key: str | None) -> TUser | None:
@@ -20,6 +20,9 @@ from urllib.parse import urljoin
 
 import loguru
 import redis
+import redis.asyncio
+
+from backend.utils.redis_pool import RedisFactory
 
 loguru.logger.remove()
 if sys.argv[:2] == ["manage.py", "runserver"]:
@@ -78,16 +81,37 @@ CORS_ALLOW_HEADERS = (
 REDIS_PREFIX = "r"
 
 
-redis_conn = redis.Redis(
-    host="127.0.0.1",
-    port=6379,
-    db=0,
-    decode_responses=True,
-)
+REDIS_OPTIONS = {
+    "host": "127.0.0.1",
+    "port": 6379,
+    "db": 0,
+    "decode_responses": True,
+    "max_connections": 100,
+    "socket_timeout": 5,
+    "socket_connect_timeout": 2,
+    "socket_keepalive": True,
+    # 空闲超过该秒数的连接使用前先 PING
+    "health_check_interval": 30,
+    "retries": 2,
+}
+
+# 连接池名称 -> 连接参数
+REDIS_POOLS = {
+    "default": REDIS_OPTIONS,
+    # 后台线程(如 snowflake 机器id续租)使用, 不占用请求的连接
+    "background": {**REDIS_OPTIONS, "max_connections": 4},
+}
 
+redis_factory = RedisFactory(REDIS_POOLS)
 
-def get_redis_connection():
-    return redis_conn
+
+def get_redis_connection(name: str = "default") -> "redis.Redis":
+    return redis_factory.get(name)
+
+
+def get_async_redis_connection(name: str = "default") -> "redis.asyncio.Redis":
+    """当前事件循环的异步redis连接, 需要在协程中调用"""
+    return redis_factory.get_async(name)
 
 
 # https://github.com/Delgan/loguru#entirely-compatible-with-standard-logging
@@ -252,7 +276,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     # "backend.middleware.logging.ApiLoggingMiddleware",
-    # "backend.middleware.performance.ServerTimingMiddleware",
+    "backend.middleware.performance.ServerTimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -264,6 +288,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Server-Timing 响应头采样率(0~1), 记录最慢SQL的数量, N+1查询检测阈值
+SERVER_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+SERVER_TIMING_SLOW_QUERIES = 3 if DEBUG else 0
+SERVER_TIMING_N_PLUS_ONE = 5 if DEBUG else 0
+
 ROOT_URLCONF = "backend.urls"
 
 STATICFILES_DIRS = [
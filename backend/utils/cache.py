@@ -0,0 +1,210 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from typing import Generic, TypeVar, overload
+
+from loguru import logger
+from redis import Redis, RedisError
+from redis.exceptions import NoScriptError
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+D = TypeVar("D")
+
+MISSING = object()
+
+# 代数未变化时才写入, 加载期间缓存被删除过时不写回旧数据
+SET_IF_GENERATION_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '0') == ARGV[1] then
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+SET_IF_GENERATION_SHA = hashlib.sha1(SET_IF_GENERATION_SCRIPT.encode()).hexdigest()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    进程内 LRU 缓存, 支持过期时间, 线程安全
+
+    maxsize: 最大缓存数量, 超出时淘汰最久未使用的项, 0为不缓存
+    ttl: 过期时间(秒), None为不过期
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"TTLCache(maxsize={self.maxsize}, ttl={self.ttl}, size={len(self._data)})"
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, MISSING) is not MISSING
+
+    @overload
+    def get(self, key: K) -> V | None: ...
+    @overload
+    def get(self, key: K, default: D) -> V | D: ...
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V, ttl=MISSING):
+        """
+        ttl: 过期时间(秒), None为不过期, 不传时使用 self.ttl
+        """
+        if self.maxsize <= 0:
+            return
+        if ttl is MISSING:
+            ttl = self.ttl
+        expires_at = float("inf") if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            item = self._data.pop(key, None)
+        if item is None:
+            return default
+        return item[1]
+
+    def discard_if(self, predicate: Callable[[K, V], bool]) -> int:
+        """删除满足条件的项, 返回删除数量"""
+        with self._lock:
+            keys = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisSetCache(Generic[K]):
+    """
+    字符串集合缓存, 进程内缓存 + redis 缓存, 用于权限等读多写少的数据
+
+    redis_conn: redis连接
+    prefix: redis缓存key前缀
+    loader: 缓存未命中时加载数据的函数
+    expires: redis缓存过期时间(秒)
+    local_ttl: 进程内缓存过期时间(秒), 即其他进程修改后本进程最长不可见的时间
+    local_maxsize: 进程内缓存最大数量
+
+    删除缓存时递增代数, 加载前读取代数, 写入 redis 时代数已变化则不写入, 避免删除前加载的旧数据被写回
+    redis 不可用时降级为直接调用 loader
+    """
+
+    def __init__(
+        self,
+        redis_conn: "Redis[str]",
+        prefix: str,
+        loader: Callable[[K], Iterable[str]],
+        expires: int = 10,
+        local_ttl: float = 10,
+        local_maxsize: int = 1024,
+    ):
+        self.redis_conn = redis_conn
+        self.prefix = prefix.removesuffix(":")
+        self.loader = loader
+        self.expires = expires
+        self.local_cache: TTLCache[K, frozenset[str]] = TTLCache(maxsize=local_maxsize, ttl=local_ttl)
+        self.generation_key = f"{self.prefix}:generation"
+
+    def get_key(self, key: K) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get(self, key: K) -> frozenset[str]:
+        value = self.local_cache.get(key)
+        if value is not None:
+            return value
+
+        value = self.get_redis(key)
+        if value is None:
+            generation = self.get_generation()
+            value = frozenset(self.loader(key))
+            if generation is not None:
+                self.set_redis(key, value, generation)
+        self.local_cache.set(key, value)
+        return value
+
+    def get_generation(self) -> str | None:
+        """当前代数, redis 不可用时返回 None"""
+        try:
+            return self.redis_conn.get(self.generation_key) or "0"
+        except RedisError as e:
+            logger.warning(f"Redis cache get generation failed: {e}")
+            return None
+
+    def get_redis(self, key: K) -> frozenset[str] | None:
+        try:
+            data = self.redis_conn.get(self.get_key(key))
+        except RedisError as e:
+            logger.warning(f"Redis cache get failed: {e}")
+            return None
+        if data is None:
+            return None
+        return frozenset(json.loads(data))
+
+    def set_redis(self, key: K, value: frozenset[str], generation: str) -> bool:
+        """
+        代数仍为 generation 时写入, 返回是否写入
+
+        generation: 加载数据前读取的代数
+        """
+        args = (2, self.generation_key, self.get_key(key), generation, json.dumps(sorted(value)), self.expires)
+        try:
+            try:
+                result = self.redis_conn.evalsha(SET_IF_GENERATION_SHA, *args)
+            except NoScriptError:
+                result = self.redis_conn.eval(SET_IF_GENERATION_SCRIPT, *args)
+        except RedisError as e:
+            logger.warning(f"Redis cache set failed: {e}")
+            return False
+        return result == 1
+
+    def invalidate(self, key: K):
+        """删除缓存"""
+        self.local_cache.pop(key)
+        try:
+            pipe = self.redis_conn.pipeline(transaction=False)
+            pipe.incr(self.generation_key)
+            pipe.delete(self.get_key(key))
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Redis cache delete failed: {e}")
+
+    def clear(self):
+        """删除全部缓存"""
+        self.local_cache.clear()
+        try:
+            self.redis_conn.incr(self.generation_key)
+            keys = [
+                k for k in self.redis_conn.scan_iter(match=f"{self.prefix}:*", count=1000) if k != self.generation_key
+            ]
+            if keys:
+                self.redis_conn.delete(*keys)
+        except RedisError as e:
+            logger.warning(f"Redis cache clear failed: {e}")
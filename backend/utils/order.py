@@ -1,7 +1,49 @@
+import os
+import threading
+
+from backend.settings import REDIS_PREFIX, get_redis_connection
 from backend.utils.snowflake import InvalidSystemClockError, Snowflake
+from backend.utils.worker_id import LeasedSnowflake
+
+# 可容忍的时钟回拨毫秒数
+SNOWFLAKE_MAX_BACKWARD_MS = 10
+# 请求中等待租用机器id的最长时间(秒)
+SNOWFLAKE_ACQUIRE_TIMEOUT = 0.5
+
+_snowflake: LeasedSnowflake | None = None
+_snowflake_pid: int | None = None
+_snowflake_lock = threading.Lock()
+
+
+def get_leased_snowflake() -> LeasedSnowflake:
+    """当前进程的 LeasedSnowflake, fork 后的子进程重新租用机器id"""
+    global _snowflake, _snowflake_pid
+    pid = os.getpid()
+    if _snowflake is None or _snowflake_pid != pid:
+        with _snowflake_lock:
+            if _snowflake is None or _snowflake_pid != pid:
+                _snowflake = LeasedSnowflake(
+                    get_redis_connection("background"),
+                    f"{REDIS_PREFIX}:snowflake:worker",
+                    max_backward_ms=SNOWFLAKE_MAX_BACKWARD_MS,
+                )
+                _snowflake_pid = pid
+    return _snowflake
 
-snowflake = Snowflake()
+
+def get_snowflake() -> Snowflake:
+    """
+    当前进程的 Snowflake, 首次使用时在后台租用机器id
+
+    最多等待 SNOWFLAKE_ACQUIRE_TIMEOUT 秒, 未租用到id或租约可能已过期时抛出 WorkerIdUnavailableError
+    """
+    return get_leased_snowflake().get(SNOWFLAKE_ACQUIRE_TIMEOUT)
 
 
 def get_goods_order_id():
-    return f"G{snowflake.generate_id()}"
+    return f"G{get_snowflake().generate_id()}"
+
+
+def get_goods_order_ids(n: int) -> list[str]:
+    """批量获取商品订单号"""
+    return [f"G{i}" for i in get_snowflake().generate_ids(n)]
@@ -1,6 +1,9 @@
 import functools
+import operator
+from collections.abc import Iterable, Iterator, Mapping, Sequence
 from typing import Any, Generic, TypeVar
 
+from django.db import connections, transaction
 from django.db.models import F, Field, ForeignObjectRel, Model, Q, QuerySet
 from django.db.models.base import ModelBase
 from django.db.models.constants import LOOKUP_SEP
@@ -79,6 +82,38 @@ def get_accessor_name(self_model: type[Model], model: type[Model]) -> str:
     raise ValueError(f"{model!r} is not a related model to {self_model!r}")
 
 
+# filter 参数名 -> lookup, ne 单独处理
+LOOKUP_ARGS = (
+    ("eq", ""),
+    ("isnull", "isnull"),
+    ("gt", "gt"),
+    ("lt", "lt"),
+    ("gte", "gte"),
+    ("lte", "lte"),
+    ("range_", "range"),
+    ("in_", "in"),
+    ("like", "like"),
+    ("startswith", "startswith"),
+    ("istartswith", "istartswith"),
+    ("endswith", "endswith"),
+    ("iendswith", "iendswith"),
+    ("contains", "contains"),
+    ("icontains", "icontains"),
+)
+
+
+@functools.cache
+def get_lookup_names(name: str) -> dict[str, str]:
+    """字段的 filter 参数名 -> 完整 lookup, 如 gte -> role__name__gte"""
+    return {arg: name + LOOKUP_SEP + lookup if lookup else name for arg, lookup in LOOKUP_ARGS}
+
+
+@functools.cache
+def get_lookup_name_tuple(name: str) -> tuple[str, ...]:
+    """按 LOOKUP_ARGS 顺序的完整 lookup"""
+    return tuple(get_lookup_names(name).values())
+
+
 class ColBase:
     def __init__(self, field: FieldOrFieldsLike):
         self.field = field
@@ -92,6 +127,7 @@ class ColQ(ColBase):
 
     def __init__(self, field: FieldOrFieldsLike):
         super().__init__(field)
+        self.lookup_names = get_lookup_name_tuple(self.name)
 
     def filter(
         self,
@@ -113,39 +149,53 @@ class ColQ(ColBase):
         contains=NOT_SET,
         icontains=NOT_SET,
     ):
-        q = Q()
-        if eq is not NOT_SET:
-            q &= Q(**{self.name: eq})
-        if isnull is not NOT_SET:
-            q &= Q(**{self.name + "__isnull": isnull})
-        if gt is not NOT_SET:
-            q &= Q(**{self.name + "__gt": gt})
-        if lt is not NOT_SET:
-            q &= Q(**{self.name + "__lt": lt})
-        if gte is not NOT_SET:
-            q &= Q(**{self.name + "__gte": gte})
-        if lte is not NOT_SET:
-            q &= Q(**{self.name + "__lte": lte})
-        if ne is not NOT_SET:
-            q &= ~Q(**{self.name: ne})
-        if range_ is not NOT_SET:
-            q &= Q(**{self.name + "__range": range_})
-        if in_ is not NOT_SET:
-            q &= Q(**{self.name + "__in": in_})
-        if like is not NOT_SET:
-            q &= Q(**{self.name + "__like": like})
-        if startswith is not NOT_SET:
-            q &= Q(**{self.name + "__startswith": startswith})
-        if istartswith is not NOT_SET:
-            q &= Q(**{self.name + "__istartswith": istartswith})
-        if endswith is not NOT_SET:
-            q &= Q(**{self.name + "__endswith": endswith})
-        if iendswith is not NOT_SET:
-            q &= Q(**{self.name + "__iendswith": iendswith})
-        if contains is not NOT_SET:
-            q &= Q(**{self.name + "__contains": contains})
-        if icontains is not NOT_SET:
-            q &= Q(**{self.name + "__icontains": icontains})
+        # 与 LOOKUP_ARGS 顺序一致
+        values = (
+            eq,
+            isnull,
+            gt,
+            lt,
+            gte,
+            lte,
+            range_,
+            in_,
+            like,
+            startswith,
+            istartswith,
+            endswith,
+            iendswith,
+            contains,
+            icontains,
+        )
+        kwargs = {k: v for k, v in zip(self.lookup_names, values) if v is not NOT_SET}
+        if ne is NOT_SET:
+            return Q(**kwargs)
+        if not kwargs:
+            return ~Q(**{self.name: ne})
+        return Q(**kwargs) & ~Q(**{self.name: ne})
+
+    @staticmethod
+    def all_of(predicates: Mapping[FieldOrFieldsLike, Mapping[str, Any]]) -> Q:
+        """
+        多个字段的条件合并为一个Q, 参数名与 filter 一致
+
+        >>> ColQ.all_of({AdminUser.username: {"icontains": "admin"}, AdminUser.pk: {"gte": 1, "ne": 2}})
+        """
+        kwargs: dict[str, Any] = {}
+        negated: list[Q] = []
+        for field, lookups in predicates.items():
+            name = get_field_name(field)
+            lookup_names = get_lookup_names(name)
+            for arg, value in lookups.items():
+                if arg == "ne":
+                    negated.append(~Q(**{name: value}))
+                elif arg in lookup_names:
+                    kwargs[lookup_names[arg]] = value
+                else:
+                    raise TypeError(f"Unknown lookup {arg!r} for field {name!r}")
+        q = Q(**kwargs)
+        for i in negated:
+            q = i if not q else q & i
         return q
 
 
@@ -224,6 +274,10 @@ class ColQuerySet(Generic[TModel]):
         )
         return ColQuerySet(self.model, self._qs.filter(q))
 
+    def filter_cols(self, predicates: Mapping[FieldOrFieldsLike, Mapping[str, Any]]):
+        """多个字段的条件, 见 ColQ.all_of"""
+        return ColQuerySet(self.model, self._qs.filter(ColQ.all_of(predicates)))
+
     def order_by_col(self, field: FieldOrFieldsLike, desc: bool = False):
         return ColQuerySet(self.model, self._qs.order_by(ColF(field).order_by(desc)))
 
@@ -239,13 +293,105 @@ class ColQuerySet(Generic[TModel]):
         return self._qs
 
     def first(self):
-        return self._qs.first()
+        return self.qs().first()
 
     def count(self):
-        return self._qs.count()
+        return self.qs().count()
+
+    def exists(self) -> bool:
+        return self.qs().exists()
 
     def all(self):
-        return self._qs.all()
+        return self.qs().all()
+
+    def iterator(self, chunk_size: int | None = None) -> Iterator[TModel]:
+        """逐块读取, 不缓存结果"""
+        return self.qs().iterator(chunk_size=chunk_size)
+
+    def values_list(self, *fields: FieldOrFieldsLike, flat: bool = False, named: bool = False):
+        return self.qs().values_list(*(get_field_name(f) for f in fields), flat=flat, named=named)
+
+    def in_bulk(self, id_list: Iterable[Any] | None = None, *, field: FieldOrFieldsLike = "pk") -> dict[Any, TModel]:
+        return self.qs().in_bulk(id_list, field_name=get_field_name(field))
 
     def update(self, values: dict[ColBase, Any]):
-        return self._qs.update(**{k.name: v for k, v in values.items()})
+        return self.qs().update(**{k.name: v for k, v in values.items()})
+
+    def bulk_update_col(
+        self,
+        objs: Iterable[TModel],
+        fields: Sequence[FieldOrFieldsLike],
+        batch_size: int | None = 500,
+    ) -> int:
+        """
+        按主键批量更新, 每批一条 UPDATE ... SET field = CASE pk WHEN ... END
+
+        fields: 需要更新的字段
+        batch_size: 每批数量
+        """
+        return self.qs().bulk_update(objs, [get_field_name(f) for f in fields], batch_size=batch_size)
+
+    def bulk_upsert_col(
+        self,
+        objs: Iterable[TModel],
+        unique_fields: Sequence[FieldOrFieldsLike],
+        update_fields: Sequence[FieldOrFieldsLike],
+        batch_size: int | None = 500,
+    ) -> list[TModel]:
+        """
+        批量插入, 唯一字段冲突时更新 update_fields
+
+        数据库支持时使用 INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE, 否则在事务内查询已存在的行后分别 bulk_update/bulk_create
+        ON CONFLICT 不回填已存在行的主键, 需要主键时重新查询
+
+        unique_fields: 唯一约束的字段
+        update_fields: 冲突时更新的字段
+        batch_size: 每批数量
+        """
+        objs = list(objs)
+        if not objs:
+            return objs
+        unique_names = [get_field_name(f) for f in unique_fields]
+        update_names = [get_field_name(f) for f in update_fields]
+        qs = self.qs()
+        features = connections[qs.db].features
+        # Django 4.1 起才有这两个特性
+        if getattr(features, "supports_update_conflicts_with_target", False):
+            return qs.bulk_create(
+                objs,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=unique_names,
+                update_fields=update_names,
+            )
+        if getattr(features, "supports_update_conflicts", False):
+            return qs.bulk_create(objs, batch_size=batch_size, update_conflicts=True, update_fields=update_names)
+
+        unique_names = [self.model._meta.get_field(name).attname for name in unique_names]
+        get_key = operator.attrgetter(*unique_names)
+        with transaction.atomic(using=qs.db):
+            existing: dict[Any, Any] = {}
+            step = batch_size or len(objs)
+            for i in range(0, len(objs), step):
+                batch = objs[i : i + step]
+                if len(unique_names) == 1:
+                    q = Q(**{f"{unique_names[0]}__in": [get_key(o) for o in batch]})
+                else:
+                    q = functools.reduce(operator.or_, (Q(**dict(zip(unique_names, get_key(o)))) for o in batch))
+                for row in self.model._default_manager.using(qs.db).filter(q).values_list("pk", *unique_names):
+                    existing[row[1] if len(row) == 2 else row[1:]] = row[0]
+
+            to_update: list[TModel] = []
+            to_create: list[TModel] = []
+            for obj in objs:
+                pk = existing.get(get_key(obj))
+                if pk is None:
+                    to_create.append(obj)
+                else:
+                    obj.pk = pk
+                    to_update.append(obj)
+            if to_update and update_names:
+                qs.bulk_update(to_update, update_names, batch_size=batch_size)
+            if to_create:
+                qs.bulk_create(to_create, batch_size=batch_size)
+        return objs
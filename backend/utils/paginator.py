@@ -0,0 +1,111 @@
+import hashlib
+from functools import cached_property
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Model, QuerySet
+
+from backend.utils.cache import TTLCache
+
+
+def estimate_count(queryset: QuerySet) -> int | None:
+    """
+    根据数据库统计信息估算无筛选条件的查询集总数, 不支持时返回 None
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.combinator or query.group_by or not query.can_filter():
+        return None
+
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == "postgresql":
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)"
+    elif connection.vendor == "mysql":
+        sql = "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CountCache:
+    """
+    查询集总数缓存, 以查询SQL和参数为键
+
+    不监听模型信号(监听 post_delete 会使 QuerySet.delete() 不再走 fast delete), 写入后的总数最长在 ttl 秒后更新,
+    需要本进程立即可见时由写入方调用 invalidate
+
+    ttl: 缓存时间(秒)
+    maxsize: 最大缓存数量
+    """
+
+    def __init__(self, ttl: float = 10, maxsize: int = 4096):
+        self.cache: TTLCache[tuple[str, str], int] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def get_key(queryset: QuerySet) -> tuple[str, str]:
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.sha1(f"{queryset.db}\n{sql}\n{params!r}".encode()).hexdigest()
+        return queryset.model._meta.label, digest
+
+    def count(self, queryset: QuerySet, estimate_threshold: int | None = None) -> int:
+        """
+        estimate_threshold: 无筛选条件且估算总数不小于该值时使用估算值, None为不估算
+        """
+        key = self.get_key(queryset)
+        count = self.cache.get(key)
+        if count is not None:
+            return count
+
+        if estimate_threshold is not None:
+            count = estimate_count(queryset)
+            if count is not None and count < estimate_threshold:
+                count = None
+        if count is None:
+            count = queryset.count()
+
+        self.cache.set(key, count)
+        return count
+
+    def invalidate(self, model: type[Model]):
+        """清除本进程内该模型的总数缓存"""
+        label = model._meta.label
+        self.cache.discard_if(lambda k, _: k[0] == label)
+
+    def clear(self):
+        self.cache.clear()
+
+
+count_cache = CountCache()
+
+
+class CachedCountPaginator(Paginator):
+    """
+    总数使用 CountCache 缓存的 Paginator
+
+    estimate_threshold: 无筛选条件且估算总数不小于该值时使用数据库估算值, None为不估算
+    """
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        orphans=0,
+        allow_empty_first_page=True,
+        estimate_threshold: int | None = None,
+        count_cache: CountCache = count_cache,
+    ):
+        super().__init__(object_list, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page)
+        self.estimate_threshold = estimate_threshold
+        self.count_cache = count_cache
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, QuerySet):
+            return self.count_cache.count(self.object_list, estimate_threshold=self.estimate_threshold)
+        return super().count
@@ -0,0 +1,81 @@
+import re
+import sys
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, NamedTuple
+
+from backend.settings import BASE_DIR
+
+if TYPE_CHECKING:
+    from backend.utils.query_logger import QueryData
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_PLACEHOLDER_RE = re.compile(r"%s|\$\d+|:\w+")
+_SPACE_RE = re.compile(r"\s+")
+
+_PROJECT_DIR = str(BASE_DIR)
+_IGNORED_DIRS = tuple(
+    str(BASE_DIR / i)
+    for i in (".venv", "venv", "tests/conftest.py", "backend/utils/query_logger.py", "backend/middleware")
+)
+
+
+def fingerprint(sql: str) -> str:
+    """
+    SQL指纹, 去掉字面量和参数, 合并 IN 列表
+
+    >>> fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'a'")
+    'SELECT * FROM t WHERE id IN (...) AND name = ?'
+    """
+    sql = _STRING_RE.sub("?", sql)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def get_caller(skip: int = 1) -> str | None:
+    """调用栈中第一个项目代码的位置, file:line in function"""
+    frame = sys._getframe(skip)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_DIR) and not filename.startswith(_IGNORED_DIRS):
+            return f"{filename[len(_PROJECT_DIR) + 1 :]}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class RepeatedQuery(NamedTuple):
+    fingerprint: str
+    count: int
+    duration: float
+    caller: str | None
+
+    def __str__(self) -> str:
+        return f"{self.count}x {self.fingerprint} at {self.caller or 'unknown'}"
+
+
+def find_repeated_queries(queries: Iterable["QueryData"], threshold: int = 5) -> list[RepeatedQuery]:
+    """
+    查找重复执行的SQL(N+1查询), 按次数降序
+
+    queries: QueryLogger.queries, 需要 capture_stack=True 才能定位调用位置
+    threshold: 同一指纹出现的最少次数
+    """
+    groups: dict[str, list[QueryData]] = {}
+    for query in queries:
+        groups.setdefault(fingerprint(query["sql"]), []).append(query)
+
+    result = [
+        RepeatedQuery(
+            fingerprint=key,
+            count=len(items),
+            duration=sum(i["duration"] for i in items),
+            caller=next((i["stack"] for i in items if i["stack"]), None),
+        )
+        for key, items in groups.items()
+        if len(items) >= threshold
+    ]
+    result.sort(key=lambda i: (-i.count, -i.duration))
+    return result
@@ -1,9 +1,12 @@
+import heapq
 import time
 from contextlib import contextmanager
 from typing import TypedDict
 
 from django.db import connection
 
+from backend.utils.query_analyzer import RepeatedQuery, find_repeated_queries, get_caller
+
 
 class QueryData(TypedDict):
     sql: str
@@ -12,16 +15,40 @@ class QueryData(TypedDict):
     status: str
     exception: str | None
     duration: float
+    stack: str | None
 
 
 class QueryLogger:
-    def __init__(self):
+    def __init__(self, record_queries: bool = True, slow_queries: int = 0, capture_stack: bool = False):
+        """
+        record_queries: 是否记录每条SQL, 为 False 时只统计数量和耗时
+        slow_queries: 记录最慢的N条SQL
+        capture_stack: 是否记录执行SQL的项目代码位置, 需要 record_queries
+        """
+        self.record_queries = record_queries
+        self.capture_stack = capture_stack
+        self.slow_queries_size = slow_queries
         self.queries: list[QueryData] = []
+        self._slow_queries: list[tuple[float, str]] = []
+        self.count = 0
+        self.duration = 0.0
 
     def __repr__(self) -> str:
-        return f"QueryLogger(queries={repr(self.queries)})"
+        return f"QueryLogger(count={self.count}, duration={self.duration}, queries={repr(self.queries)})"
+
+    @property
+    def slow_queries(self) -> list[tuple[float, str]]:
+        """最慢的N条SQL, (耗时, SQL), 按耗时降序"""
+        return sorted(self._slow_queries, reverse=True)
 
     def __call__(self, execute, sql, params, many, context):
+        if not self.record_queries:
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.add(sql, time.perf_counter() - start)
+
         current_query: QueryData = {
             "sql": sql,
             "params": params,
@@ -29,6 +56,7 @@ class QueryLogger:
             "status": "unknown",
             "exception": None,
             "duration": 0,
+            "stack": get_caller() if self.capture_stack else None,
         }
         start = time.perf_counter()
         try:
@@ -44,6 +72,20 @@ class QueryLogger:
             duration = time.perf_counter() - start
             current_query["duration"] = duration
             self.queries.append(current_query)
+            self.add(sql, duration)
+
+    def add(self, sql: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        if self.slow_queries_size:
+            if len(self._slow_queries) < self.slow_queries_size:
+                heapq.heappush(self._slow_queries, (duration, sql))
+            elif duration > self._slow_queries[0][0]:
+                heapq.heapreplace(self._slow_queries, (duration, sql))
+
+    def repeated_queries(self, threshold: int = 5) -> list[RepeatedQuery]:
+        """重复执行的SQL(N+1查询)"""
+        return find_repeated_queries(self.queries, threshold=threshold)
 
     @contextmanager
     def execute_wrapper(self):
@@ -0,0 +1,170 @@
+import functools
+import heapq
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TypedDict
+
+from redis import Redis
+from redis.client import Pipeline
+
+INSTALLED_ATTR = "_redis_logger_installed"
+
+active_redis_loggers: ContextVar[tuple["RedisLogger", ...]] = ContextVar("active_redis_loggers", default=())
+
+
+class RedisCommandData(TypedDict):
+    command: str
+    key: str | None
+    size: int
+    status: str
+    exception: str | None
+    duration: float
+
+
+def get_key_prefix(key: Any) -> str | None:
+    """key前缀, r:token:admin:1 -> r:token:admin"""
+    if not isinstance(key, (str, bytes)):
+        return None
+    if isinstance(key, bytes):
+        key = key.decode(errors="replace")
+    return key.rpartition(":")[0] or key
+
+
+def get_payload_size(value: Any) -> int:
+    """命令参数或返回值的大致字节数"""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (list, tuple, set)):
+        return sum(get_payload_size(i) for i in value)
+    if isinstance(value, dict):
+        return sum(get_payload_size(k) + get_payload_size(v) for k, v in value.items())
+    return 0
+
+
+def get_command_info(args: tuple) -> tuple[str, str | None, int]:
+    """(命令, key前缀, 参数大小), EVAL/EVALSHA 取第一个key"""
+    if not args:
+        return "", None, 0
+    command = str(args[0]).upper()
+    key = None
+    if command in ("EVAL", "EVALSHA"):
+        if len(args) > 3 and int(args[2]) > 0:
+            key = get_key_prefix(args[3])
+    elif len(args) > 1:
+        key = get_key_prefix(args[1])
+    return command, key, get_payload_size(args[1:])
+
+
+def get_pipeline_info(pipe: Pipeline) -> tuple[str, str | None, int]:
+    """pipeline 作为一条命令记录, key前缀取第一条命令的"""
+    infos = [get_command_info(args) for args, _ in pipe.command_stack]
+    key = infos[0][1] if infos else None
+    return "PIPELINE", key, sum(i[2] for i in infos)
+
+
+def wrap_execute(
+    func: Callable[..., Any], get_info: Callable[[Any, tuple], tuple[str, str | None, int]]
+) -> Callable[..., Any]:
+    """get_info: (客户端, 参数) -> (命令, key前缀, 参数大小)"""
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **options):
+        loggers = active_redis_loggers.get()
+        if not loggers:
+            return func(self, *args, **options)
+        info = get_info(self, args)
+        execute: Callable[[], Any] = functools.partial(func, self, *args, **options)
+        for redis_logger in loggers:
+            execute = functools.partial(redis_logger, execute, *info)
+        return execute()
+
+    return wrapper
+
+
+def install():
+    """
+    包装 Redis.execute_command 和 Pipeline.execute, 对所有同步客户端(包括各连接池和 fakeredis)生效,
+    只在有激活的 RedisLogger 时记录, 重复调用只包装一次
+    """
+    if getattr(Redis, INSTALLED_ATTR, False):
+        return
+    Redis.execute_command = wrap_execute(  # type: ignore[method-assign]
+        Redis.execute_command, lambda _, args: get_command_info(args)
+    )
+    Pipeline.execute = wrap_execute(Pipeline.execute, lambda pipe, _: get_pipeline_info(pipe))  # type: ignore[method-assign]
+    setattr(Redis, INSTALLED_ATTR, True)
+
+
+class RedisLogger:
+    def __init__(self, record_commands: bool = True, slow_commands: int = 0):
+        """
+        record_commands: 是否记录每条命令, 为 False 时只统计数量, 耗时和数据大小
+        slow_commands: 记录最慢的N条命令
+        """
+        self.record_commands = record_commands
+        self.slow_commands_size = slow_commands
+        self.commands: list[RedisCommandData] = []
+        self._slow_commands: list[tuple[float, str]] = []
+        self.count = 0
+        self.duration = 0.0
+        self.size = 0
+
+    def __repr__(self) -> str:
+        return f"RedisLogger(count={self.count}, duration={self.duration}, commands={self.commands!r})"
+
+    @property
+    def slow_commands(self) -> list[tuple[float, str]]:
+        """最慢的N条命令, (耗时, 命令 key前缀), 按耗时降序"""
+        return sorted(self._slow_commands, reverse=True)
+
+    def __call__(self, execute: Callable[[], Any], command: str, key: str | None, size: int):
+        status = "unknown"
+        exception = None
+        result = None
+        start = time.perf_counter()
+        try:
+            result = execute()
+        except Exception as e:
+            status = "error"
+            exception = repr(e)
+            raise
+        else:
+            status = "ok"
+            return result
+        finally:
+            duration = time.perf_counter() - start
+            size += get_payload_size(result)
+            if self.record_commands:
+                self.commands.append(
+                    {
+                        "command": command,
+                        "key": key,
+                        "size": size,
+                        "status": status,
+                        "exception": exception,
+                        "duration": duration,
+                    }
+                )
+            self.add(command if key is None else f"{command} {key}", duration, size)
+
+    def add(self, command: str, duration: float, size: int = 0):
+        self.count += 1
+        self.duration += duration
+        self.size += size
+        if self.slow_commands_size:
+            if len(self._slow_commands) < self.slow_commands_size:
+                heapq.heappush(self._slow_commands, (duration, command))
+            elif duration > self._slow_commands[0][0]:
+                heapq.heapreplace(self._slow_commands, (duration, command))
+
+    @contextmanager
+    def execute_wrapper(self) -> Iterator["RedisLogger"]:
+        """记录当前上下文中所有同步redis客户端的命令, pipeline 记为一条 PIPELINE 命令"""
+        install()
+        token = active_redis_loggers.set((*active_redis_loggers.get(), self))
+        try:
+            yield self
+        finally:
+            active_redis_loggers.reset(token)
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import socket
+import threading
+import weakref
+from typing import Any
+
+import redis
+import redis.asyncio
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from redis.retry import Retry
+
+# 重试的指数退避(秒)
+RETRY_BACKOFF_BASE = 0.05
+RETRY_BACKOFF_CAP = 1.0
+
+# fork 后需要重置的工厂, 弱引用, 不阻止工厂被回收
+_factories: "weakref.WeakSet[RedisFactory]" = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    for factory in list(_factories):
+        factory.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class RedisFactory:
+    """
+    redis客户端工厂, 每个名称一个连接池, 同名客户端在进程内共用
+
+    pools: 名称 -> 连接参数, 即 redis.ConnectionPool 的参数, 另外支持
+        retries: 连接和执行命令时连接错误和超时的重试次数, 指数退避, 默认不重试
+
+    fork 后子进程丢弃继承的连接(如 uwsgi 未开启 lazy-apps 时在 master 中导入的客户端), 已获取的客户端可继续使用
+    """
+
+    def __init__(self, pools: dict[str, dict[str, Any]]):
+        self.pools = pools
+        self.clients: dict[str, redis.Redis] = {}
+        # redis.asyncio 的连接不能跨事件循环使用, 每个事件循环一组客户端
+        self.async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, redis.asyncio.Redis]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        _factories.add(self)
+
+    def get_options(self, name: str) -> tuple[dict[str, Any], int]:
+        if name not in self.pools:
+            raise KeyError(f"Redis pool {name!r} is not configured")
+        options = dict(self.pools[name])
+        retries = options.pop("retries", 0)
+        return options, retries
+
+    def create(self, name: str) -> redis.Redis:
+        options, retries = self.get_options(name)
+        if retries:
+            options["retry"] = Retry(ExponentialBackoff(cap=RETRY_BACKOFF_CAP, base=RETRY_BACKOFF_BASE), retries)
+            # 不设置时只重试建立连接, 执行命令时的错误直接抛出
+            options["retry_on_error"] = [RedisConnectionError, RedisTimeoutError]
+        return redis.Redis(connection_pool=redis.ConnectionPool(**options))
+
+    def create_async(self, name: str) -> redis.asyncio.Redis:
+        options, retries = self.get_options(name)
+        if retries:
+            options["retry"] = AsyncRetry(ExponentialBackoff(cap=RETRY_BACKOFF_CAP, base=RETRY_BACKOFF_BASE), retries)
+            options["retry_on_error"] = [RedisConnectionError, RedisTimeoutError, socket.timeout, asyncio.TimeoutError]
+        return redis.asyncio.Redis(connection_pool=redis.asyncio.ConnectionPool(**options))
+
+    def get(self, name: str = "default") -> redis.Redis:
+        client = self.clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self.clients.get(name)
+                if client is None:
+                    client = self.clients[name] = self.create(name)
+        return client
+
+    def get_async(self, name: str = "default") -> redis.asyncio.Redis:
+        """当前事件循环的异步客户端, 需要在协程中调用"""
+        loop = asyncio.get_running_loop()
+        clients = self.async_clients.get(loop)
+        if clients is None:
+            clients = self.async_clients[loop] = {}
+        client = clients.get(name)
+        if client is None:
+            client = clients[name] = self.create_async(name)
+        return client
+
+    def set(self, name: str, client: redis.Redis):
+        """替换客户端, 如测试时使用 fakeredis"""
+        with self._lock:
+            self.clients[name] = client
+
+    def reset(self):
+        """丢弃继承自父进程的连接, 不关闭父进程仍在使用的socket"""
+        # fork 时其他线程可能持有锁
+        self._lock = threading.Lock()
+        for client in self.clients.values():
+            client.connection_pool.reset()
+        self.async_clients = weakref.WeakKeyDictionary()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """各连接池的连接数"""
+        data = {}
+        for name, client in list(self.clients.items()):
+            pool = client.connection_pool
+            data[name] = {
+                "max_connections": pool.max_connections,
+                "created": pool._created_connections,
+                "in_use": len(pool._in_use_connections),
+                "idle": len(pool._available_connections),
+            }
+        return data
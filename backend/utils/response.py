@@ -94,8 +94,10 @@ class EventSourceResponse(StreamingHttpResponse):
     """
     @example
     ```
-    @router.get("/stream")
+    @router.get("/stream", auth=auth_admin_async)
     async def stream(request: HttpRequest):
+        user = await auth_admin_async.get_login_user(request)
+
         async def sse_generator():
             for i in range(10):
                 yield ServerSentEvent(
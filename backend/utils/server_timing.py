@@ -0,0 +1,52 @@
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class ServerTiming:
+    """
+    请求内各阶段的耗时统计, 由 ServerTimingMiddleware 创建
+    """
+
+    def __init__(self):
+        # name -> [耗时, 次数]
+        self.metrics: dict[str, list[float]] = {}
+
+    def add(self, name: str, duration: float, count: int = 1):
+        metric = self.metrics.get(name)
+        if metric is None:
+            self.metrics[name] = [duration, count]
+        else:
+            metric[0] += duration
+            metric[1] += count
+
+    @contextmanager
+    def activate(self) -> Iterator["ServerTiming"]:
+        token = current_server_timing.set(self)
+        try:
+            yield self
+        finally:
+            current_server_timing.reset(token)
+
+
+current_server_timing: ContextVar[ServerTiming | None] = ContextVar("current_server_timing", default=None)
+
+
+@contextmanager
+def server_timing(name: str) -> Iterator[None]:
+    """
+    统计代码块耗时, 未采样的请求不统计
+
+    >>> with server_timing("auth"):
+    >>>     ...
+    """
+    timing = current_server_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - start)
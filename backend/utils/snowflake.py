@@ -1,7 +1,15 @@
+import array
 import os
+import threading
 import time
 import uuid
-from typing import NamedTuple
+from collections.abc import Iterable
+from typing import Any, NamedTuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class SnowflakeData(NamedTuple):
@@ -11,6 +19,15 @@ class SnowflakeData(NamedTuple):
     sequence: int
 
 
+class SnowflakeColumns(NamedTuple):
+    """批量解析结果, 每个字段为等长的 numpy.ndarray(int64), 未安装 numpy 时为 array.array"""
+
+    timestamp: Any
+    datacenter_id: Any
+    worker_id: Any
+    sequence: Any
+
+
 class InvalidSystemClockError(OSError):
     """
     时钟回拨异常
@@ -38,57 +55,108 @@ class Snowflake:
     # Twitter元年时间戳
     TWEPOCH = 1288834974657
 
-    def __init__(self, datacenter_id: int | None = None, worker_id: int | None = None):
+    def __init__(self, datacenter_id: int | None = None, worker_id: int | None = None, max_backward_ms: int = 0):
+        """
+        datacenter_id: 数据中心id, 默认取MAC地址
+        worker_id: 机器id, 默认取进程id, 多进程部署时建议使用 WorkerIdLease 分配
+        max_backward_ms: 可容忍的时钟回拨毫秒数, 回拨不超过该值时沿用上次时间戳继续分配序号, 序号用完后等待时钟追上
+        """
         if worker_id is None:
             worker_id = os.getpid() & self.MAX_WORKER_ID
         if datacenter_id is None:
             datacenter_id = uuid.getnode() & self.MAX_DATACENTER_ID
 
-        if worker_id > self.MAX_WORKER_ID or worker_id < 0:
-            raise ValueError(f"Worker ID can't be greater than {self.MAX_WORKER_ID} or less than 0")
-
-        if datacenter_id > self.MAX_DATACENTER_ID or datacenter_id < 0:
-            raise ValueError(f"Data center ID can't be greater than {self.MAX_DATACENTER_ID} or less than 0")
-
+        self.check_ids(datacenter_id, worker_id)
         self.worker_id = worker_id
         self.datacenter_id = datacenter_id
-        self.sequence = 0
+        self.max_backward_ms = max_backward_ms
+        self.sequence = 0  # 上次使用的序号
         self.last_timestamp = -1  # 上次计算的时间戳
+        self._lock = threading.Lock()
+
+    @classmethod
+    def check_ids(cls, datacenter_id: int, worker_id: int):
+        if worker_id > cls.MAX_WORKER_ID or worker_id < 0:
+            raise ValueError(f"Worker ID can't be greater than {cls.MAX_WORKER_ID} or less than 0")
+
+        if datacenter_id > cls.MAX_DATACENTER_ID or datacenter_id < 0:
+            raise ValueError(f"Data center ID can't be greater than {cls.MAX_DATACENTER_ID} or less than 0")
+
+    def set_ids(self, datacenter_id: int, worker_id: int):
+        """更换数据中心id和机器id, 线程安全"""
+        self.check_ids(datacenter_id, worker_id)
+        with self._lock:
+            self.datacenter_id = datacenter_id
+            self.worker_id = worker_id
 
     def timestamp_ms(self):
         """整数毫秒时间戳"""
-        return int(time.time() * 1000)
+        return time.time_ns() // 1_000_000
+
+    def make_id(self, timestamp: int, sequence: int) -> int:
+        return (
+            ((timestamp - self.TWEPOCH) << self.TIMESTAMP_SHIFT)
+            | (self.datacenter_id << self.DATACENTER_ID_SHIFT)
+            | (self.worker_id << self.WOKER_ID_SHIFT)
+            | sequence
+        )
+
+    def reserve(self, count: int) -> tuple[int, int, int]:
+        """
+        在当前毫秒内预留连续的序号, 需要持有锁
 
-    def generate_id(self):
-        """获取新ID"""
+        count: 需要的序号数量, 超出当前毫秒剩余数量时只预留剩余部分
+        返回 (时间戳, 起始序号, 预留数量)
+        """
         timestamp = self.timestamp_ms()
 
         # 时钟回拨
         if timestamp < self.last_timestamp:
-            raise InvalidSystemClockError(f"Clock is moving backwards, rejecting requests until {self.last_timestamp}")
+            if self.last_timestamp - timestamp > self.max_backward_ms:
+                raise InvalidSystemClockError(
+                    f"Clock is moving backwards, rejecting requests until {self.last_timestamp}"
+                )
+            timestamp = self.last_timestamp
 
+        start = 0
         if timestamp == self.last_timestamp:
-            self.sequence = (self.sequence + 1) & self.MAX_SEQUENCE
-            if self.sequence == 0:
+            start = self.sequence + 1
+            if start > self.MAX_SEQUENCE:
                 timestamp = self.till_next_millis(self.last_timestamp)
-        else:
-            self.sequence = 0
+                start = 0
 
+        reserved = min(count, self.MAX_SEQUENCE + 1 - start)
+        self.sequence = start + reserved - 1
         self.last_timestamp = timestamp
-
-        new_id = (
-            ((timestamp - self.TWEPOCH) << self.TIMESTAMP_SHIFT)
-            | (self.datacenter_id << self.DATACENTER_ID_SHIFT)
-            | (self.worker_id << self.WOKER_ID_SHIFT)
-            | self.sequence
-        )
-        return new_id
+        return timestamp, start, reserved
+
+    def generate_id(self) -> int:
+        """获取新ID, 线程安全"""
+        with self._lock:
+            timestamp, sequence, _ = self.reserve(1)
+        return self.make_id(timestamp, sequence)
+
+    def generate_ids(self, n: int) -> list[int]:
+        """批量获取n个递增的新ID, 线程安全, 按毫秒整段预留序号"""
+        ranges: list[tuple[int, int, int]] = []
+        with self._lock:
+            remaining = n
+            while remaining > 0:
+                timestamp, start, reserved = self.reserve(remaining)
+                ranges.append((timestamp, start, reserved))
+                remaining -= reserved
+
+        ids: list[int] = []
+        for timestamp, start, reserved in ranges:
+            base = self.make_id(timestamp, 0)
+            ids.extend(range(base + start, base + start + reserved))
+        return ids
 
     @classmethod
     def parse(cls, snowflake: int):
         timestamp = (snowflake >> cls.TIMESTAMP_SHIFT) + cls.TWEPOCH
-        datacenter_id = snowflake >> cls.DATACENTER_ID_SHIFT & cls.MAX_WORKER_ID
-        worker_id = snowflake >> cls.WOKER_ID_SHIFT & cls.MAX_DATACENTER_ID
+        datacenter_id = snowflake >> cls.DATACENTER_ID_SHIFT & cls.MAX_DATACENTER_ID
+        worker_id = snowflake >> cls.WOKER_ID_SHIFT & cls.MAX_WORKER_ID
         sequence = snowflake & cls.MAX_SEQUENCE
         return SnowflakeData(
             timestamp=timestamp,
@@ -97,11 +165,43 @@ class Snowflake:
             sequence=sequence,
         )
 
+    @classmethod
+    def parse_many(cls, snowflakes: Iterable[int], use_numpy: bool = True) -> SnowflakeColumns:
+        """
+        批量解析, 返回按列存储的时间戳, 数据中心id, 机器id, 序号
+
+        snowflakes: id序列或 numpy 整数数组
+        use_numpy: 安装了 numpy 时使用向量化计算
+        """
+        if np is not None and use_numpy:
+            ids = np.asarray(snowflakes, dtype=np.int64)
+            return SnowflakeColumns(
+                timestamp=(ids >> cls.TIMESTAMP_SHIFT) + cls.TWEPOCH,
+                datacenter_id=(ids >> cls.DATACENTER_ID_SHIFT) & cls.MAX_DATACENTER_ID,
+                worker_id=(ids >> cls.WOKER_ID_SHIFT) & cls.MAX_WORKER_ID,
+                sequence=ids & cls.MAX_SEQUENCE,
+            )
+
+        ids = snowflakes if isinstance(snowflakes, (list, tuple, array.array)) else list(snowflakes)
+        timestamp_shift, datacenter_id_shift, worker_id_shift = (
+            cls.TIMESTAMP_SHIFT,
+            cls.DATACENTER_ID_SHIFT,
+            cls.WOKER_ID_SHIFT,
+        )
+        max_datacenter_id, max_worker_id, max_sequence = cls.MAX_DATACENTER_ID, cls.MAX_WORKER_ID, cls.MAX_SEQUENCE
+        return SnowflakeColumns(
+            timestamp=array.array("q", [(i >> timestamp_shift) + cls.TWEPOCH for i in ids]),
+            datacenter_id=array.array("q", [i >> datacenter_id_shift & max_datacenter_id for i in ids]),
+            worker_id=array.array("q", [i >> worker_id_shift & max_worker_id for i in ids]),
+            sequence=array.array("q", [i & max_sequence for i in ids]),
+        )
+
     def till_next_millis(self, last_timestamp: int):
         """
-        等到下一毫秒
+        等到下一毫秒, 每次最多休眠1毫秒
         """
         timestamp = self.timestamp_ms()
         while timestamp <= last_timestamp:
+            time.sleep(min(last_timestamp + 1 - timestamp, 1) / 1000)
             timestamp = self.timestamp_ms()
         return timestamp
@@ -0,0 +1,222 @@
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from loguru import logger
+from redis import Redis, RedisError
+
+from backend.utils.snowflake import Snowflake
+
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class WorkerIdUnavailableError(RuntimeError):
+    """
+    没有可用的机器id
+    """
+
+
+class WorkerIdLeaseExpiredError(WorkerIdUnavailableError):
+    """
+    租约可能已过期, id 可能已分配给其他进程
+    """
+
+
+class WorkerIdLease:
+    """
+    从 redis 租用 Snowflake 的 (datacenter_id, worker_id), 后台线程定时续期
+
+    redis_conn: redis连接
+    prefix: redis key前缀
+    ttl: 租期(秒), 进程异常退出后该时间内id不会分配给其他进程
+    heartbeat_interval: 续期间隔(秒), 默认为 ttl/3
+    safety_margin: 距上次成功续期超过 ttl - safety_margin 秒后视为租约失效, 默认为 ttl/4
+    on_change: 租约丢失并重新租用到其他id时的回调, 参数为 (datacenter_id, worker_id)
+    """
+
+    SIZE = (Snowflake.MAX_DATACENTER_ID + 1) * (Snowflake.MAX_WORKER_ID + 1)
+
+    def __init__(
+        self,
+        redis_conn: "Redis[Any]",
+        prefix: str,
+        ttl: int = 60,
+        heartbeat_interval: float | None = None,
+        safety_margin: float | None = None,
+        on_change: Callable[[int, int], None] | None = None,
+    ):
+        self.redis_conn = redis_conn
+        self.prefix = prefix.removesuffix(":")
+        self.ttl = ttl
+        self.heartbeat_interval = ttl / 3 if heartbeat_interval is None else heartbeat_interval
+        self.safety_margin = ttl / 4 if safety_margin is None else safety_margin
+        self.on_change = on_change
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self.lease_id: int | None = None
+        # 最近一次成功租用或续期的命令发出时间(monotonic)
+        self.renewed_at: float | None = None
+        self._renew_script = redis_conn.register_script(RENEW_SCRIPT)
+        self._release_script = redis_conn.register_script(RELEASE_SCRIPT)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def get_key(self, lease_id: int) -> str:
+        return f"{self.prefix}:{lease_id}"
+
+    @staticmethod
+    def split(lease_id: int) -> tuple[int, int]:
+        """租约id -> (datacenter_id, worker_id)"""
+        return lease_id >> Snowflake.WORKER_ID_BITS, lease_id & Snowflake.MAX_WORKER_ID
+
+    def take(self) -> tuple[int, float]:
+        """租用一个空闲的id, 返回 (租约id, 命令发出时间), 不设置 renewed_at, 租约在调用方设置后才有效"""
+        start = random.randrange(self.SIZE)
+        for i in range(self.SIZE):
+            lease_id = (start + i) % self.SIZE
+            sent_at = time.monotonic()
+            if self.redis_conn.set(self.get_key(lease_id), self.owner, nx=True, ex=self.ttl):
+                self.lease_id = lease_id
+                return lease_id, sent_at
+        raise WorkerIdUnavailableError(f"All {self.SIZE} snowflake worker ids are leased")
+
+    def acquire(self) -> tuple[int, int]:
+        """租用一个空闲的id并启动续期线程, 返回 (datacenter_id, worker_id)"""
+        lease_id, self.renewed_at = self.take()
+        self.start_heartbeat()
+        return self.split(lease_id)
+
+    def renew(self) -> bool:
+        """续期, 租约已丢失时返回 False"""
+        if self.lease_id is None:
+            return False
+        sent_at = time.monotonic()
+        if not self._renew_script(keys=[self.get_key(self.lease_id)], args=[self.owner, self.ttl]):
+            return False
+        self.renewed_at = sent_at
+        return True
+
+    def is_valid(self) -> bool:
+        """租约是否仍然有效, 不访问 redis"""
+        if self.lease_id is None or self.renewed_at is None:
+            return False
+        return time.monotonic() - self.renewed_at < self.ttl - self.safety_margin
+
+    def check(self):
+        """租约失效时抛出 WorkerIdLeaseExpiredError, 此时不能再用该id生成新id"""
+        if not self.is_valid():
+            raise WorkerIdLeaseExpiredError(f"Snowflake worker id lease {self.lease_id} may have expired")
+
+    def release(self):
+        """停止续期并释放id"""
+        self._stop.set()
+        if self.lease_id is None:
+            return
+        try:
+            self._release_script(keys=[self.get_key(self.lease_id)], args=[self.owner])
+        except RedisError as e:
+            logger.warning(f"Snowflake worker id release failed: {e}")
+        self.lease_id = None
+        self.renewed_at = None
+
+    def start_heartbeat(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._heartbeat, name="snowflake-worker-id-lease", daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            self.heartbeat()
+
+    def heartbeat(self):
+        """
+        续期一次, 租约丢失时重新租用
+
+        旧id可能已分配给其他进程, 重新租用前先使租约失效, on_change 应用新id后才恢复有效
+        """
+        try:
+            if self.renew():
+                return
+            logger.error(f"Snowflake worker id lease {self.lease_id} lost, acquiring a new one")
+            self.renewed_at = None
+            lease_id, sent_at = self.take()
+        except (RedisError, WorkerIdUnavailableError) as e:
+            # 下次心跳重试, 超过 ttl - safety_margin 仍未成功时 check() 失败, 停止生成id
+            logger.warning(f"Snowflake worker id renew failed: {e}")
+            return
+        if self.on_change is not None:
+            self.on_change(*self.split(lease_id))
+        self.renewed_at = sent_at
+
+
+class LeasedSnowflake:
+    """
+    使用 WorkerIdLease 租用机器id的 Snowflake, 在后台线程中租用, 获取时最多等待 timeout 秒
+
+    redis_conn: redis连接
+    prefix: redis key前缀
+    max_backward_ms: 可容忍的时钟回拨毫秒数
+    retry_interval: 租用失败后的重试间隔(秒)
+    """
+
+    def __init__(
+        self,
+        redis_conn: "Redis[Any]",
+        prefix: str,
+        max_backward_ms: int = 0,
+        retry_interval: float = 1,
+        **lease_options: Any,
+    ):
+        self.snowflake = Snowflake(max_backward_ms=max_backward_ms)
+        self.lease = WorkerIdLease(redis_conn, prefix, on_change=self.snowflake.set_ids, **lease_options)
+        self.retry_interval = retry_interval
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        """开始后台租用, 重复调用只启动一次"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._acquire, name="snowflake-worker-id-acquire", daemon=True)
+            self._thread.start()
+
+    def _acquire(self):
+        while True:
+            try:
+                self.snowflake.set_ids(*self.lease.acquire())
+            except (RedisError, WorkerIdUnavailableError) as e:
+                logger.warning(f"Snowflake worker id lease failed: {e}")
+                time.sleep(self.retry_interval)
+                continue
+            self._ready.set()
+            return
+
+    def get(self, timeout: float | None = None) -> Snowflake:
+        """
+        返回租约有效的 Snowflake, 未在 timeout 秒内租用到id或租约失效时抛出 WorkerIdUnavailableError
+        """
+        self.start()
+        if not self._ready.wait(timeout):
+            raise WorkerIdUnavailableError("Snowflake worker id is not leased yet")
+        self.lease.check()
+        return self.snowflake
@@ -0,0 +1,125 @@
+"""
+API 请求链路基准测试, 使用 SQLite 测试数据库和 fakeredis
+
+端到端: admin/login, admin/user/info, admin/user/info/list (不同数据量), ping
+分层: AuthBearerToken.authenticate, schema_response 序列化, CustomJsonEncoder, ColQuerySet 构造
+
+python benchmarks/bench_api.py > bench_api.json
+"""
+
+import argparse
+import json
+
+from common import bench, dump_results, setup_test_environment
+
+setup_test_environment()
+
+from django.contrib.auth.hashers import make_password
+from django.test import Client, RequestFactory
+
+from backend.apps.back.models import AdminPermission, AdminUser, Role
+from backend.apps.back.schema import AdminUserModelSchema
+from backend.decorator.response import get_json_serializer
+from backend.renderer import CustomJsonEncoder
+from backend.response import L
+from backend.security import auth_admin
+from backend.utils.orm import ColQuerySet
+
+USERNAME = "root"
+PASSWORD = "root@123"
+
+
+def create_users(total: int):
+    """补齐后台用户数量到 total, 一半用户分配角色"""
+    role = Role.objects.first()
+    if role is None:
+        role = Role.objects.create(name="bench role")
+        role.permission.set(AdminPermission.objects.all()[:3])
+    start = AdminUser.objects.count()
+    AdminUser.objects.bulk_create(
+        [
+            AdminUser(username=f"bench user {i}", nickname=f"用户{i}", role=role if i % 2 else None)
+            for i in range(start, total)
+        ]
+    )
+
+
+def login(client: Client) -> str:
+    response = client.post(
+        "/api/back/admin/login",
+        data={"username": USERNAME, "password": PASSWORD},
+        content_type="application/json",
+    )
+    assert response.status_code == 200, response.content
+    return response.json()["data"]["token"]
+
+
+def bench_endpoints(sizes: list[int]) -> list[dict]:
+    AdminUser.objects.create(nickname=USERNAME, username=USERNAME, password=make_password(PASSWORD), is_superadmin=True)
+
+    client = Client()
+    results = [bench("GET /api/ping", lambda: client.get("/api/ping"))]
+    results.append(bench("POST /api/back/admin/login", lambda: login(client), repeat=3))
+
+    token = login(client)
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+    results.append(bench("GET /api/back/admin/user/info", lambda: client.get("/api/back/admin/user/info", **headers)))
+    for size in sizes:
+        create_users(size)
+        results.append(
+            bench(
+                f"GET /api/back/admin/user/info/list users={size}",
+                lambda: client.get("/api/back/admin/user/info/list", {"size": 20}, **headers),
+            )
+        )
+    return results
+
+
+def bench_layers() -> list[dict]:
+    results = []
+
+    token = auth_admin.generate_token(AdminUser.objects.get(username=USERNAME).pk)
+    request = RequestFactory().get("/")
+    results.append(bench("AuthBearerToken.authenticate cached", lambda: auth_admin.authenticate(request, token)))
+
+    def authenticate_uncached():
+        auth_admin.verify_cache.clear()
+        return auth_admin.authenticate(request, token)
+
+    results.append(bench("AuthBearerToken.authenticate uncached", authenticate_uncached))
+
+    users = AdminUser.objects.select_related("role").prefetch_related("role__permission")[:20]
+    payload = L.ok([AdminUserModelSchema.from_orm(i) for i in users])
+    serializer = get_json_serializer(L[AdminUserModelSchema])
+    results.append(bench("schema_response L[AdminUserModelSchema] x20", lambda: serializer(payload)))
+    results.append(
+        bench("CustomJsonEncoder L[AdminUserModelSchema] x20", lambda: json.dumps(payload, cls=CustomJsonEncoder))
+    )
+
+    def build_queryset():
+        return (
+            ColQuerySet(AdminUser)
+            .filter_col(AdminUser.username, startswith="bench")
+            .filter_col(AdminUser.role_id, isnull=False)
+            .order_by_col(AdminUser.id, desc=True)
+            .select_related_col(AdminUser.role)
+            .qs()
+        )
+
+    results.append(bench("ColQuerySet build", build_queryset))
+    results.append(bench("ColQuerySet build + compile", lambda: str(build_queryset().query)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000], help="后台用户表数据量")
+    args = parser.parse_args()
+
+    results = bench_endpoints(sorted(args.sizes))
+    results += bench_layers()
+    dump_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+ColQ 条件构造: 逐个参数拼接 Q 的旧实现, 预计算 lookup 的 filter, 多字段 all_of
+
+python benchmarks/bench_orm.py > bench_orm.json
+"""
+
+from common import bench, dump_results, setup_django
+
+setup_django()
+
+from django.db.models import Q
+
+from backend.apps.back.models import AdminUser, Role
+from backend.utils.orm import NOT_SET, ColBase, ColQ
+
+
+class ConcatColQ(ColBase):
+    """预计算 lookup 之前的 ColQ.filter"""
+
+    def filter(
+        self,
+        eq=NOT_SET,
+        *,
+        isnull=NOT_SET,
+        gt=NOT_SET,
+        lt=NOT_SET,
+        gte=NOT_SET,
+        lte=NOT_SET,
+        ne=NOT_SET,
+        range_=NOT_SET,
+        in_=NOT_SET,
+        like=NOT_SET,
+        startswith=NOT_SET,
+        istartswith=NOT_SET,
+        endswith=NOT_SET,
+        iendswith=NOT_SET,
+        contains=NOT_SET,
+        icontains=NOT_SET,
+    ):
+        q = Q()
+        if eq is not NOT_SET:
+            q &= Q(**{self.name: eq})
+        if isnull is not NOT_SET:
+            q &= Q(**{self.name + "__isnull": isnull})
+        if gt is not NOT_SET:
+            q &= Q(**{self.name + "__gt": gt})
+        if lt is not NOT_SET:
+            q &= Q(**{self.name + "__lt": lt})
+        if gte is not NOT_SET:
+            q &= Q(**{self.name + "__gte": gte})
+        if lte is not NOT_SET:
+            q &= Q(**{self.name + "__lte": lte})
+        if ne is not NOT_SET:
+            q &= ~Q(**{self.name: ne})
+        if range_ is not NOT_SET:
+            q &= Q(**{self.name + "__range": range_})
+        if in_ is not NOT_SET:
+            q &= Q(**{self.name + "__in": in_})
+        if like is not NOT_SET:
+            q &= Q(**{self.name + "__like": like})
+        if startswith is not NOT_SET:
+            q &= Q(**{self.name + "__startswith": startswith})
+        if istartswith is not NOT_SET:
+            q &= Q(**{self.name + "__istartswith": istartswith})
+        if endswith is not NOT_SET:
+            q &= Q(**{self.name + "__endswith": endswith})
+        if iendswith is not NOT_SET:
+            q &= Q(**{self.name + "__iendswith": iendswith})
+        if contains is not NOT_SET:
+            q &= Q(**{self.name + "__contains": contains})
+        if icontains is not NOT_SET:
+            q &= Q(**{self.name + "__icontains": icontains})
+        return q
+
+
+def legacy_list_filter():
+    return (
+        ConcatColQ(AdminUser.username).filter(icontains="admin")
+        & ConcatColQ(AdminUser.create_time).filter(gte="2024-01-01", lt="2025-01-01")
+        & ConcatColQ((AdminUser.role, Role.name)).filter(isnull=False, ne="guest")
+    )
+
+
+def list_filter():
+    return (
+        ColQ(AdminUser.username).filter(icontains="admin")
+        & ColQ(AdminUser.create_time).filter(gte="2024-01-01", lt="2025-01-01")
+        & ColQ((AdminUser.role, Role.name)).filter(isnull=False, ne="guest")
+    )
+
+
+def list_filter_all_of():
+    return ColQ.all_of(
+        {
+            AdminUser.username: {"icontains": "admin"},
+            AdminUser.create_time: {"gte": "2024-01-01", "lt": "2025-01-01"},
+            (AdminUser.role, Role.name): {"isnull": False, "ne": "guest"},
+        }
+    )
+
+
+def conditions(q: Q) -> list[str]:
+    """WHERE 条件, 忽略顺序"""
+    where = str(AdminUser.objects.filter(q).query).split(" WHERE ", 1)[1]
+    return sorted(where.removeprefix("(").removesuffix(")").split(" AND "))
+
+
+def main():
+    results = []
+    expected = conditions(legacy_list_filter())
+    for name, func in (
+        ("single lookup legacy", lambda: ConcatColQ(AdminUser.pk).filter(1)),
+        ("single lookup", lambda: ColQ(AdminUser.pk).filter(1)),
+        ("list filter legacy", legacy_list_filter),
+        ("list filter", list_filter),
+        ("list filter all_of", list_filter_all_of),
+    ):
+        if name.startswith("list"):
+            assert conditions(func()) == expected, name
+        results.append(bench(name, func))
+        results.append(bench(f"{name} + queryset", lambda f=func: AdminUser.objects.filter(f())))
+    dump_results(results)
+
+
+if __name__ == "__main__":
+    main()
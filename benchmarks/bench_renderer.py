@@ -0,0 +1,100 @@
+"""
+对比 CustomJsonEncoder, orjson 与 schema_response 预编译序列化渲染 D/L 响应的耗时
+
+python benchmarks/bench_renderer.py > bench_renderer.json
+"""
+
+import datetime
+import decimal
+import json
+from collections.abc import Generator, Mapping
+
+from common import bench, dump_results, setup_django
+
+setup_django()
+
+from django.db import models
+from django.db.models.fields.files import FieldFile
+from filebrowser.base import FileObject
+from ninja.responses import NinjaJSONEncoder
+
+from backend.apps.back.schema import AdminUserModelSchema
+from backend.decorator.response import get_json_serializer
+from backend.renderer import CustomJsonEncoder, orjson, orjson_dumps
+from backend.response import D, L
+from backend.settings import USE_TZ
+
+
+class IsinstanceJsonEncoder(NinjaJSONEncoder):
+    """改为类型分派表之前的 CustomJsonEncoder"""
+
+    def default(self, o):
+        if isinstance(o, FieldFile):
+            return o.url
+        if isinstance(o, FileObject):
+            return o.url
+        if isinstance(o, models.Model):
+            return str(o)
+        if isinstance(o, decimal.Decimal):
+            return f"{o:f}"
+        if not USE_TZ and isinstance(o, datetime.datetime):
+            return o.strftime("%Y-%m-%d %H:%M:%S")
+        if isinstance(o, dict):
+            return o
+        if isinstance(o, Mapping):
+            return dict(o)
+        if isinstance(o, str):
+            return o
+        if isinstance(o, Generator):
+            return list(o)
+        return super().default(o)
+
+
+def make_user(i: int) -> AdminUserModelSchema:
+    return AdminUserModelSchema(
+        id=i,
+        avatar="https://example.com/media/default_avatar.svg",
+        nickname=f"用户{i}",
+        username=f"user{i}",
+        summary="",
+        role_name="管理员",
+        role_id=1,
+        permissions=["Admin"],
+    )
+
+
+def make_payloads():
+    now = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    return {
+        "D[AdminUserModelSchema]": (D[AdminUserModelSchema], D.ok(make_user(1))),
+        "L[AdminUserModelSchema] x100": (L[AdminUserModelSchema], L.ok([make_user(i) for i in range(100)])),
+        "L[dict] x100": (
+            L[dict],
+            L.ok(
+                [
+                    {"id": i, "price": decimal.Decimal("9.90"), "create_time": now, "name": f"商品{i}"}
+                    for i in range(100)
+                ]
+            ),
+        ),
+    }
+
+
+def main():
+    results = []
+    for name, (response, payload) in make_payloads().items():
+        expected = json.loads(json.dumps(payload, cls=CustomJsonEncoder))
+        assert json.loads(json.dumps(payload, cls=IsinstanceJsonEncoder)) == expected
+        results.append(bench(f"{name} isinstance", lambda p=payload: json.dumps(p, cls=IsinstanceJsonEncoder)))
+        results.append(bench(f"{name} singledispatch", lambda p=payload: json.dumps(p, cls=CustomJsonEncoder)))
+        if orjson is not None:
+            assert json.loads(orjson_dumps(payload)) == expected
+            results.append(bench(f"{name} orjson", lambda p=payload: orjson_dumps(p)))
+        serializer = get_json_serializer(response)
+        assert json.loads(serializer(payload)) == expected
+        results.append(bench(f"{name} schema_response", lambda p=payload, f=serializer: f(p)))
+    dump_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Snowflake ID 生成吞吐量, 单线程/多线程, 单个/批量
+
+python benchmarks/bench_snowflake.py > bench_snowflake.json
+"""
+
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from common import bench, dump_results, setup_path
+
+setup_path()
+
+from backend.utils.snowflake import Snowflake
+
+
+def generate_threads(snowflake: Snowflake, threads: int, per_thread: int, batch: int):
+    def worker():
+        if batch == 1:
+            for _ in range(per_thread):
+                snowflake.generate_id()
+        else:
+            for _ in range(per_thread // batch):
+                snowflake.generate_ids(batch)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+
+def bench_ids(name: str, func: Callable[[], Any], count: int) -> dict[str, Any]:
+    result = bench(name, func, repeat=3)
+    result["ids_per_second"] = count / result["best"]
+    return result
+
+
+def main():
+    snowflake = Snowflake(datacenter_id=0, worker_id=0)
+    results = []
+    for n in (1000, 100_000):
+        results.append(bench_ids(f"generate_id x{n}", lambda n=n: [snowflake.generate_id() for _ in range(n)], n))
+        results.append(bench_ids(f"generate_ids({n})", lambda n=n: snowflake.generate_ids(n), n))
+    per_thread = 20000
+    for threads in (1, 4, 8):
+        for batch in (1, 100):
+            results.append(
+                bench_ids(
+                    f"{threads} threads x {per_thread} ids batch={batch}",
+                    lambda t=threads, b=batch: generate_threads(snowflake, t, per_thread, b),
+                    threads * per_thread,
+                )
+            )
+    dump_results(results)
+
+
+if __name__ == "__main__":
+    main()
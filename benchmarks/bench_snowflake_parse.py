@@ -0,0 +1,33 @@
+"""
+Snowflake 批量解析: 逐个 parse, parse_many(array 回退), parse_many(numpy)
+
+python benchmarks/bench_snowflake_parse.py > bench_snowflake_parse.json
+"""
+
+from common import bench, dump_results, setup_path
+
+setup_path()
+
+from backend.utils.snowflake import Snowflake, np
+
+
+def main():
+    snowflake = Snowflake(datacenter_id=1, worker_id=2)
+    results = []
+    for n in (10_000, 1_000_000):
+        ids = snowflake.generate_ids(n)
+        results.append(bench(f"parse x{n}", lambda ids=ids: [Snowflake.parse(i) for i in ids], repeat=3))
+        results.append(
+            bench(f"parse_many({n}) array", lambda ids=ids: Snowflake.parse_many(ids, use_numpy=False), repeat=3)
+        )
+        if np is not None:
+            results.append(bench(f"parse_many({n}) numpy list", lambda ids=ids: Snowflake.parse_many(ids), repeat=3))
+            id_array = np.asarray(ids, dtype=np.int64)
+            results.append(
+                bench(f"parse_many({n}) numpy ndarray", lambda a=id_array: Snowflake.parse_many(a), repeat=3)
+            )
+    dump_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_path():
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+
+
+def setup_django():
+    setup_path()
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+    import django
+
+    django.setup()
+
+
+class DisableMigrations(dict):
+    def __contains__(self, item: object) -> bool:
+        return True
+
+    def __getitem__(self, item: str) -> None:
+        return None
+
+
+def setup_test_environment():
+    """
+    使用 fakeredis 和 SQLite 测试数据库初始化 Django, 需要安装 fakeredis
+    """
+    setup_path()
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+    import fakeredis
+
+    from backend import settings
+
+    # 导入 app 时会获取 redis 连接, 需要在 django.setup() 之前替换
+    server = fakeredis.FakeServer()
+    for name in settings.REDIS_POOLS:
+        settings.redis_factory.set(name, fakeredis.FakeRedis(server=server, decode_responses=True))
+
+    import django
+    from django.conf import settings as django_settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment as django_setup_test_environment
+
+    django.setup()
+    django_setup_test_environment()
+    # 与 pytest --no-migrations 一致, 直接按模型建表
+    django_settings.MIGRATION_MODULES = DisableMigrations()
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+
+
+def bench(name: str, func: Callable[[], Any], repeat: int = 5, min_time: float = 0.2) -> dict[str, Any]:
+    """
+    多次运行取最优, 返回每次调用耗时(秒)和每秒调用次数
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    timings = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    best = min(timings)
+    return {
+        "name": name,
+        "number": number,
+        "repeat": repeat,
+        "best": best,
+        "mean": sum(timings) / len(timings),
+        "ops": 1 / best if best else None,
+    }
+
+
+def dump_results(results: list[dict[str, Any]]):
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
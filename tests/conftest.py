@@ -1,10 +1,13 @@
-from collections.abc import Iterator
+import time
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
 
 import pytest
 from django.contrib.auth.hashers import make_password
 from loguru import logger
 
 from backend.apps.back.models import AdminPermission, AdminUser, Role
+from backend.utils.query_logger import QueryLogger
 
 
 @pytest.fixture
@@ -47,6 +50,75 @@ def role(db, permission: AdminPermission):
     return r
 
 
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def assert_no_repeated_queries(db) -> Callable[..., AbstractContextManager[QueryLogger]]:
+    """
+    同一SQL指纹执行不少于 threshold 次(N+1查询)时测试失败
+
+    >>> with assert_no_repeated_queries(threshold=3):
+    >>>     client.get(...)
+    """
+
+    @contextmanager
+    def check(threshold: int = 3) -> Iterator[QueryLogger]:
+        with QueryLogger(capture_stack=True).execute_wrapper() as ql:
+            yield ql
+        repeated = ql.repeated_queries(threshold)
+        if repeated:
+            pytest.fail("Repeated queries:\n" + "\n".join(str(i) for i in repeated))
+
+    return check
+
+
+# 操作名 -> [(查询数, 耗时)]
+query_budget_results: dict[str, list[tuple[int, float]]] = {}
+
+
+@pytest.fixture
+def query_budget(db) -> Callable[..., AbstractContextManager[QueryLogger]]:
+    """
+    查询数量和耗时超出预算时测试失败, 结果汇总在测试报告末尾
+
+    >>> with query_budget("GET /admin/user/info", max_queries=2, max_seconds=0.5):
+    >>>     client.get("/admin/user/info")
+    """
+
+    @contextmanager
+    def check(name: str, max_queries: int, max_seconds: float | None = None) -> Iterator[QueryLogger]:
+        with QueryLogger(record_queries=False).execute_wrapper() as ql:
+            start = time.perf_counter()
+            yield ql
+            duration = time.perf_counter() - start
+        query_budget_results.setdefault(name, []).append((ql.count, duration))
+        if ql.count > max_queries:
+            pytest.fail(f"{name}: {ql.count} queries exceed the budget of {max_queries}")
+        if max_seconds is not None and duration > max_seconds:
+            pytest.fail(f"{name}: {duration:.3f}s exceeds the budget of {max_seconds}s")
+
+    return check
+
+
+def pytest_terminal_summary(terminalreporter: pytest.TerminalReporter):
+    if not query_budget_results:
+        return
+    terminalreporter.write_sep("-", "query budget")
+    width = max(len(i) for i in query_budget_results)
+    terminalreporter.write_line(f"{'operation':<{width}}  {'calls':>5}  {'queries':>7}  {'avg ms':>8}  {'max ms':>8}")
+    for name, results in sorted(query_budget_results.items()):
+        queries = max(i[0] for i in results)
+        durations = [i[1] * 1000 for i in results]
+        terminalreporter.write_line(
+            f"{name:<{width}}  {len(results):>5}  {queries:>7}  "
+            f"{sum(durations) / len(durations):>8.2f}  {max(durations):>8.2f}"
+        )
+
+
 # pytest-loguru
 @pytest.fixture
 def caplog(caplog: pytest.LogCaptureFixture) -> Iterator[pytest.LogCaptureFixture]:
@@ -0,0 +1,236 @@
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+from ninja.errors import AuthenticationError
+
+from backend.apps.back.models import AdminUser, Role
+from backend.security.auth import CHECK_RENEW_SCRIPT, AsyncAuthBearerToken, AuthBearerToken, AuthRevocableJwt
+
+
+@pytest.fixture
+def auth_bearer(fake_redis):
+    return AuthBearerToken(
+        user_model=AdminUser,
+        expires=60,
+        redis_conn=fake_redis,
+        renew_interval=30,
+    )
+
+
+def count_commands(redis_conn, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    commands: list[str] = []
+    execute_command = redis_conn.execute_command
+
+    def wrapper(*args, **kwargs):
+        commands.append(args[0])
+        return execute_command(*args, **kwargs)
+
+    monkeypatch.setattr(redis_conn, "execute_command", wrapper)
+    return commands
+
+
+def test_auth_bearer_verify_cache(auth_bearer: AuthBearerToken, fake_redis, monkeypatch: pytest.MonkeyPatch):
+    token = auth_bearer.generate_token(1)
+    commands = count_commands(fake_redis, monkeypatch)
+
+    for _ in range(10):
+        assert auth_bearer.authenticate(None, token) == 1  # type: ignore
+
+    # 生成token时已续期, 后续请求命中进程内缓存
+    assert commands == ["GET"]
+
+
+def test_auth_bearer_renew(auth_bearer: AuthBearerToken, fake_redis, monkeypatch: pytest.MonkeyPatch):
+    token = auth_bearer.generate_token(1)
+    auth_bearer.verify_cache.clear()
+    auth_bearer.renew_cache.clear()
+    fake_redis.script_load(CHECK_RENEW_SCRIPT)
+    fake_redis.expire(auth_bearer.get_token_key(1), 10)
+    commands = count_commands(fake_redis, monkeypatch)
+
+    # 检查和续期为一次脚本调用
+    assert auth_bearer.authenticate(None, token) == 1  # type: ignore
+    assert commands == ["EVALSHA"]
+    assert fake_redis.ttl(auth_bearer.get_token_key(1)) > 10
+
+
+def test_auth_bearer_renew_script_not_loaded(auth_bearer: AuthBearerToken, fake_redis):
+    token = auth_bearer.generate_token(1)
+    fake_redis.script_flush()
+    assert auth_bearer.token_check(1, token, renew=True)
+    assert not auth_bearer.token_check(1, "other", renew=True)
+    assert not auth_bearer.token_check(2, token, renew=True)
+
+
+def test_auth_bearer_relogin(auth_bearer: AuthBearerToken, monkeypatch: pytest.MonkeyPatch):
+    now = time.time()
+    with monkeypatch.context() as m:
+        m.setattr(time, "time", lambda: now - 1)
+        old_token = auth_bearer.generate_token(1)
+    assert auth_bearer.authenticate(None, old_token) == 1  # type: ignore
+
+    new_token = auth_bearer.generate_token(1)
+    assert auth_bearer.authenticate(None, old_token) is None  # type: ignore
+    assert auth_bearer.authenticate(None, new_token) == 1  # type: ignore
+
+
+def test_auth_bearer_bulk_tokens(auth_bearer: AuthBearerToken, fake_redis, monkeypatch: pytest.MonkeyPatch):
+    tokens = {uid: auth_bearer.generate_token(uid) for uid in range(1, 6)}
+    for uid, token in tokens.items():
+        assert auth_bearer.authenticate(None, token) == uid  # type: ignore
+    commands = count_commands(fake_redis, monkeypatch)
+
+    assert auth_bearer.get_tokens([*tokens, 6], batch_size=2) == {**tokens, 6: None}
+    assert commands == ["MGET"] * 3
+
+    assert auth_bearer.revoke_tokens([1, 2, 3, 6], batch_size=2) == 3
+    assert auth_bearer.revoke_tokens([]) == 0
+
+    # 进程内缓存同时清除
+    assert auth_bearer.authenticate(None, tokens[1]) is None  # type: ignore
+    assert auth_bearer.authenticate(None, tokens[4]) == 4  # type: ignore
+    assert auth_bearer.get_tokens([1, 4]) == {1: None, 4: tokens[4]}
+
+
+def test_auth_bearer_invalid_token(auth_bearer: AuthBearerToken):
+    with pytest.raises(AuthenticationError):
+        auth_bearer.authenticate(None, "invalid")  # type: ignore
+
+
+def test_auth_bearer_login_user_cached_on_request(
+    auth_bearer: AuthBearerToken,
+    admin_user: AdminUser,
+    role: Role,
+    rf: RequestFactory,
+    django_assert_num_queries,
+):
+    admin_user.role = role
+    admin_user.save(update_fields=["role"])
+    auth_bearer.select_related = ("role",)
+    auth_bearer.prefetch_related = ("role__permission",)
+
+    permission_list = role.permission_list
+    assert not role.is_admin
+    request = rf.get("/")
+    request.auth = admin_user.pk  # type: ignore
+    with django_assert_num_queries(2):
+        user = auth_bearer.get_login_user(request)
+        assert auth_bearer.get_login_user(request) is user
+        assert user.role_name == role.name
+        assert user.permissions == permission_list
+        assert not user.is_admin
+
+
+def test_async_auth_bearer(admin_user: AdminUser, django_assert_num_queries):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    async_redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    auth_async = AsyncAuthBearerToken(user_model=AdminUser, expires=60, redis_conn=lambda: async_redis)
+    auth_sync = AuthBearerToken(
+        user_model=AdminUser, expires=60, redis_conn=fakeredis.FakeRedis(server=server, decode_responses=True)
+    )
+
+    async def run():
+        token = await auth_async.generate_token(admin_user.pk)
+        # 与同步版本共用token
+        assert auth_sync.authenticate(None, token) == admin_user.pk  # type: ignore
+
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        assert await auth_async.get_login_uid(request) == admin_user.pk
+        user = await auth_async.get_login_user(request)
+        assert user.pk == admin_user.pk
+        assert await auth_async.get_login_user(request) is user
+
+        assert await auth_async.get_tokens([admin_user.pk]) == {admin_user.pk: token}
+
+        # 重新登录后旧token失效
+        await async_redis.set(f"{auth_async.cache_token_prefix}:{admin_user.pk}", "new token")
+        auth_async.clear_cache(admin_user.pk)
+        with pytest.raises(AuthenticationError):
+            await auth_async.get_login_uid(RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+
+        assert await auth_async.revoke_tokens([admin_user.pk]) == 1
+        assert await auth_async.get_tokens([admin_user.pk]) == {admin_user.pk: None}
+
+    with django_assert_num_queries(1):
+        async_to_sync(run)()
+
+
+def test_auth_revocable_jwt(fake_redis, monkeypatch: pytest.MonkeyPatch):
+    # 两个实例模拟两个进程
+    auth_a = AuthRevocableJwt(redis_conn=fake_redis, expires=60, user_model=AdminUser, sync_interval=5)
+    auth_b = AuthRevocableJwt(redis_conn=fake_redis, expires=60, user_model=AdminUser, sync_interval=5)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+    real_time = time.time
+    with monkeypatch.context() as m:
+        m.setattr(time, "time", lambda: real_time() - 2)
+        token = auth_a.generate_token(1)
+        other_token = auth_a.generate_token(1)
+    assert auth_a.authenticate(None, token) == 1  # type: ignore
+    assert auth_b.authenticate(None, token) == 1  # type: ignore
+
+    # 同步间隔内不访问 redis
+    commands = count_commands(fake_redis, monkeypatch)
+    for _ in range(10):
+        assert auth_b.authenticate(None, token) == 1  # type: ignore
+    assert commands == []
+
+    auth_a.revoke_token(token)
+    assert auth_a.authenticate(None, token) is None  # type: ignore
+    assert auth_a.authenticate(None, other_token) == 1  # type: ignore
+    # 其他进程在同步后失效
+    assert auth_b.authenticate(None, token) == 1  # type: ignore
+    monkeypatch.setattr(time, "monotonic", lambda: now + 5)
+    assert auth_b.authenticate(None, token) is None  # type: ignore
+    assert auth_b.authenticate(None, other_token) == 1  # type: ignore
+
+    # 版本号未变化时只读取版本号
+    commands.clear()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10)
+    assert auth_b.authenticate(None, other_token) == 1  # type: ignore
+    assert commands == ["GET"]
+
+    # 注销时间之前签发的 token 失效, 之后签发的有效
+    with monkeypatch.context() as m:
+        m.setattr(time, "time", lambda: real_time() - 1)
+        auth_a.revoke_uids([1])
+    monkeypatch.setattr(time, "monotonic", lambda: now + 15)
+    assert auth_b.authenticate(None, other_token) is None  # type: ignore
+    assert auth_b.authenticate(None, auth_b.generate_token(1)) == 1  # type: ignore
+    assert auth_b.authenticate(None, auth_b.generate_token(2)) == 2  # type: ignore
+
+
+def test_auth_revocable_jwt_same_second(fake_redis, monkeypatch: pytest.MonkeyPatch):
+    auth = AuthRevocableJwt(redis_conn=fake_redis, expires=60, user_model=AdminUser, sync_interval=0)
+    # 注销和重新登录在同一秒内, 只按毫秒区分
+    second = int(time.time()) - 1
+    monkeypatch.setattr(time, "time", lambda: second + 0.1)
+    old_token = auth.generate_token(1)
+    monkeypatch.setattr(time, "time", lambda: second + 0.2)
+    auth.revoke_uids([1])
+    monkeypatch.setattr(time, "time", lambda: second + 0.3)
+    new_token = auth.generate_token(1)
+
+    assert auth.authenticate(None, old_token) is None  # type: ignore
+    assert auth.authenticate(None, new_token) == 1  # type: ignore
+
+
+def test_auth_revocable_jwt_prune(fake_redis, monkeypatch: pytest.MonkeyPatch):
+    auth_a = AuthRevocableJwt(redis_conn=fake_redis, expires=60, user_model=AdminUser, sync_interval=0)
+    auth_b = AuthRevocableJwt(redis_conn=fake_redis, expires=60, user_model=AdminUser, sync_interval=0)
+    real_time = time.time
+    with monkeypatch.context() as m:
+        m.setattr(time, "time", lambda: real_time() - 120)
+        auth_a.revoke_uids([1])
+    auth_b.sync(force=True)
+    assert auth_b.not_before == {}
+
+    # 早于 expires 秒前的注销记录在注销时删除
+    auth_a.revoke_uids([2])
+    assert fake_redis.zrange(auth_a.not_before_key, 0, -1) == ["2"]
+    assert list(auth_a.not_before) == ["2"]
+    assert fake_redis.ttl(auth_a.not_before_key) == -1
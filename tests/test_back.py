@@ -1,4 +1,12 @@
-from backend.apps.back.models import AdminPermission, AdminUser, Role
+import io
+
+import pytest
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.db.migrations.state import ProjectState
+
+from backend.apps.back.models import AdminPermission, AdminUser, Role, RolePermission, role_permission_cache
+from backend.apps.back.signals import sync_admin_permission
 
 
 def test_permission(permission: AdminPermission):
@@ -36,3 +44,63 @@ def test_admin_no_admin_permission(
     admin_user: AdminUser,
 ):
     assert not admin_user.has_permission(AdminPermission.Keys.Admin)
+
+
+def test_role_permission_cache(
+    admin_user: AdminUser,
+    role: Role,
+    permission: AdminPermission,
+    fake_redis,
+    monkeypatch: pytest.MonkeyPatch,
+    django_assert_num_queries,
+):
+    monkeypatch.setattr(role_permission_cache, "redis_conn", fake_redis)
+    role_permission_cache.local_cache.clear()
+    admin_user.role = role
+    admin_user.save(update_fields=["role"])
+
+    with django_assert_num_queries(1):
+        assert admin_user.has_permission(permission.key)
+        assert not admin_user.is_admin
+        assert not role.is_admin
+    assert fake_redis.exists(role_permission_cache.get_key(role.pk))
+
+    # 其他进程: 进程内缓存为空, 从 redis 读取
+    role_permission_cache.local_cache.clear()
+    with django_assert_num_queries(0):
+        assert admin_user.has_permission(permission.key)
+
+    # migrate 后已同步 Keys 中的权限
+    admin_permission = AdminPermission.objects.get(key=AdminPermission.Keys.Admin)
+    role.permission.add(admin_permission)
+    assert not fake_redis.exists(role_permission_cache.get_key(role.pk))
+    assert admin_user.is_admin
+
+    RolePermission.objects.filter(role=role, permission=admin_permission).delete()
+    assert not admin_user.is_admin
+
+
+def test_admin_permission_sync_data(db, django_assert_num_queries):
+    # migrate 后已同步
+    assert set(AdminPermission.objects.values_list("key", flat=True)) >= set(AdminPermission.Keys.values)
+
+    AdminPermission.objects.filter(key=AdminPermission.Keys.Admin).update(name="old name")
+    # savepoint, 查询, 批量更新, release
+    with django_assert_num_queries(4):
+        AdminPermission.sync_data()
+    assert AdminPermission.objects.get(key=AdminPermission.Keys.Admin).name == AdminPermission.Keys.Admin.label
+
+    AdminPermission.objects.filter(key=AdminPermission.Keys.Admin).delete()
+    call_command("sync_permission", stdout=io.StringIO())
+    assert AdminPermission.objects.filter(key=AdminPermission.Keys.Admin).exists()
+
+
+def test_sync_admin_permission_unmigrated(db, django_assert_num_queries):
+    config = django_apps.get_app_config("back")
+    # back 未迁移或已回滚到 zero 时迁移状态中没有权限模型
+    with django_assert_num_queries(0):
+        sync_admin_permission(sender=config, using="default", apps=ProjectState().apps)
+
+    AdminPermission.objects.filter(key=AdminPermission.Keys.Admin).delete()
+    sync_admin_permission(sender=config, using="default", apps=ProjectState.from_apps(django_apps).apps)
+    assert AdminPermission.objects.filter(key=AdminPermission.Keys.Admin).exists()
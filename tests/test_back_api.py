@@ -59,10 +59,11 @@ def test_post_admin_password_reset(client: TestClient):
     check_business_code(response)
 
 
-def test_get_admin_user_info(client: TestClient):
-    response = client.get(
-        "/admin/user/info",
-    )
+def test_get_admin_user_info(client: TestClient, query_budget):
+    with query_budget("GET /admin/user/info", max_queries=1, max_seconds=0.5):
+        response = client.get(
+            "/admin/user/info",
+        )
     check_business_code(response)
 
 
@@ -83,25 +84,28 @@ def test_post_admin_user_info_edit(client: TestClient):
     assert user.avatar == "test avatar"
 
 
-def test_get_admin_user_info_detail(client: TestClient):
-    response = client.get(
-        "/admin/user/info/detail",
-        params={"admin_user_id": 1},
-    )
+def test_get_admin_user_info_detail(client: TestClient, query_budget):
+    with query_budget("GET /admin/user/info/detail", max_queries=1, max_seconds=0.5):
+        response = client.get(
+            "/admin/user/info/detail",
+            params={"admin_user_id": 1},
+        )
     check_business_code(response)
 
 
-def test_get_admin_user_info_list(client: TestClient):
-    response = client.get(
-        "/admin/user/info/list",
-    )
+def test_get_admin_user_info_list(client: TestClient, query_budget):
+    with query_budget("GET /admin/user/info/list", max_queries=3, max_seconds=0.5):
+        response = client.get(
+            "/admin/user/info/list",
+        )
     check_business_data(response)
 
 
-def test_get_admin_permission_list(client: TestClient):
-    response = client.get(
-        "/admin/permission/list",
-    )
+def test_get_admin_permission_list(client: TestClient, query_budget):
+    with query_budget("GET /admin/permission/list", max_queries=3, max_seconds=0.5):
+        response = client.get(
+            "/admin/permission/list",
+        )
     check_business_data(response)
 
 
@@ -120,14 +124,15 @@ def test_post_admin_permission_edit(client: TestClient):
     assert permission.description == "test description"
 
 
-def test_get_admin_role_list(client: TestClient):
+def test_get_admin_role_list(client: TestClient, query_budget):
     Role.objects.get_or_create(
         id=1,
         defaults={"name": "test role list", "description": "test description list"},
     )
-    response = client.get(
-        "/admin/role/list",
-    )
+    with query_budget("GET /admin/role/list", max_queries=3, max_seconds=0.5):
+        response = client.get(
+            "/admin/role/list",
+        )
     check_business_data(response)
 
 
@@ -162,14 +167,15 @@ def test_post_admin_role_add(client: TestClient):
     assert Role.objects.filter(name="test role add").exists()
 
 
-def test_get_admin_role_permission_list(client: TestClient):
+def test_get_admin_role_permission_list(client: TestClient, query_budget):
     Role.objects.get_or_create(
         id=1,
         defaults={"name": "test role", "description": "test description"},
     )
-    response = client.get(
-        "/admin/role/permission/list?id=1",
-    )
+    with query_budget("GET /admin/role/permission/list", max_queries=3, max_seconds=0.5):
+        response = client.get(
+            "/admin/role/permission/list?id=1",
+        )
     check_business_data(response)
 
 
@@ -229,21 +235,23 @@ def post_admin_user_add(client: TestClient):
     assert AdminUser.objects.filter(username="test user add").exists()
 
 
-def test_get_admin_dropdown_role_list(client: TestClient):
+def test_get_admin_dropdown_role_list(client: TestClient, query_budget):
     role, _ = Role.objects.get_or_create(
         id=1,
         defaults={"name": "test role", "description": "test description"},
     )
-    response = client.get(
-        "/admin/dropdown/role",
-    )
+    with query_budget("GET /admin/dropdown/role", max_queries=1, max_seconds=0.5):
+        response = client.get(
+            "/admin/dropdown/role",
+        )
     check_business_data(response)
 
 
-def test_get_admin_dropdown_permission_list(client: TestClient):
-    response = client.get(
-        "/admin/dropdown/permission",
-    )
+def test_get_admin_dropdown_permission_list(client: TestClient, query_budget):
+    with query_budget("GET /admin/dropdown/permission", max_queries=1, max_seconds=0.5):
+        response = client.get(
+            "/admin/dropdown/permission",
+        )
     check_business_data(response)
 
 
@@ -263,3 +271,23 @@ def test_post_admin_user_role_edit(client: TestClient):
     check_business_code(response)
     user.refresh_from_db()
     assert user.role == role
+
+
+def test_get_admin_user_info_list_queries(client: TestClient, django_assert_num_queries, assert_no_repeated_queries):
+    permission = AdminPermission.objects.get(id=1)
+    for i in range(3):
+        role = Role.objects.create(name=f"test role {i}")
+        role.permission.add(permission)
+        for j in range(3):
+            AdminUser.objects.create(username=f"test user {i} {j}", role=role)
+
+    # 登录用户, count, 分页, 角色, 角色权限
+    with django_assert_num_queries(5), assert_no_repeated_queries(threshold=2):
+        response = client.get(
+            "/admin/user/info/list",
+            params={"size": 20},
+        )
+    check_business_data(response)
+    data = response.json()["data"]
+    assert len(data) == 10
+    assert all(i["roles"] == [permission.key] for i in data if i["role_id"])
@@ -0,0 +1,86 @@
+import datetime
+import decimal
+import json
+import warnings
+
+from django.http import HttpRequest
+from ninja import Schema
+
+from backend.apps.back.schema import AdminUserModelSchema, RolePermissionSchema
+from backend.decorator.response import get_json_serializer, is_json_native, schema_response
+from backend.middleware.logging import ApiLoggingMiddleware
+from backend.renderer import CustomJsonEncoder
+from backend.response import D, L
+
+
+class OrderSchema(Schema):
+    price: decimal.Decimal
+    create_time: datetime.datetime
+
+
+def test_is_json_native():
+    assert is_json_native(D[None])
+    assert is_json_native(D[AdminUserModelSchema])
+    assert is_json_native(L[AdminUserModelSchema])
+    assert is_json_native(D[RolePermissionSchema])
+    assert is_json_native(D[dict[str, list[int | None]]])
+    assert not is_json_native(D[dict])
+    assert not is_json_native(D[OrderSchema])
+    assert not is_json_native(L[OrderSchema])
+
+
+def test_get_json_serializer():
+    user = AdminUserModelSchema(
+        id=1,
+        avatar="",
+        nickname="中文",
+        username="admin",
+        summary="",
+        role_name="",
+        role_id=None,
+        permissions=["Admin"],
+    )
+    order = OrderSchema(price=decimal.Decimal("1.50"), create_time=datetime.datetime(2024, 1, 2, 3, 4, 5))
+    for response, result in [
+        (D[AdminUserModelSchema], D.ok(user)),
+        (L[AdminUserModelSchema], L.ok([user, user])),
+        (D[OrderSchema], D.ok(order)),
+        (D[None], D.success()),
+    ]:
+        content = get_json_serializer(response)(result)
+        assert json.loads(content) == json.loads(json.dumps(result, cls=CustomJsonEncoder))
+
+    # 未标注返回类型
+    assert json.loads(get_json_serializer(None)({"a": order})) == {
+        "a": {"price": "1.50", "create_time": "2024-01-02 03:04:05"}
+    }
+
+    content = get_json_serializer(D[OrderSchema])(D.ok(order))
+    assert json.loads(content)["data"] == {"price": "1.50", "create_time": "2024-01-02 03:04:05"}
+
+    # 返回值与声明的模型不一致时使用 CustomJsonEncoder 的格式, 不产生序列化警告
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        content = get_json_serializer(D[AdminUserModelSchema])(D.ok({"create_time": order.create_time}))
+    assert json.loads(content)["data"] == {"create_time": "2024-01-02 03:04:05"}
+
+
+def test_schema_response():
+    @schema_response
+    def view(request: HttpRequest) -> D[OrderSchema]:
+        return D.ok(OrderSchema(price=decimal.Decimal(1), create_time=datetime.datetime(2024, 1, 1)))
+
+    response = view(HttpRequest())
+    assert response["Content-Type"] == "application/json"
+    assert json.loads(response.content)["data"]["price"] == "1"
+
+
+def test_api_logging_readable_json():
+    assert ApiLoggingMiddleware._readable_json('{"a": "中文"}'.encode()) == '{"a": "中文"}'
+    assert ApiLoggingMiddleware._readable_json(b'{"a": "\\u4e2d"}') == '{"a": "中"}'
+    assert ApiLoggingMiddleware._readable_json(b"\xff{\n") == "�{ "
+    assert ApiLoggingMiddleware._safe_loads_dict(b"\xff") == {}
+    # 嵌套过深的 JSON 在解析时抛出 RecursionError, 不影响请求
+    nested = b"[" * 100_000 + b"]" * 100_000
+    assert ApiLoggingMiddleware._safe_loads_dict(nested) == {}
+    assert ApiLoggingMiddleware._readable_json(nested) == nested.decode()
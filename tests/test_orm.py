@@ -1,4 +1,6 @@
-from django.db.models import Q, Value
+import pytest
+from django.db import NotSupportedError, connections
+from django.db.models import Q, QuerySet, Value
 from django.db.models.functions import Concat
 
 from backend.apps.back.models import AdminPermission, AdminUser, Role, RolePermission
@@ -52,6 +54,24 @@ def test_col():
     assert (ColQ(AdminUser.username).filter(isnull=False)) == Q(username__isnull=False)
     assert (ColQ((AdminUser.role, Role.name)).filter(isnull=True)) == Q(role__name__isnull=True)
     assert (ColQ((AdminUser.role, Role.name)).filter(isnull=False)) == Q(role__name__isnull=False)
+    assert (ColQ(AdminUser.pk).filter(gt=0, lt=10)) == Q(pk__gt=0, pk__lt=10)
+    assert (ColQ(AdminUser.pk).filter(gt=0, ne=5)) == Q(pk__gt=0) & ~Q(pk=5)
+
+
+def test_col_all_of():
+    q = ColQ.all_of(
+        {
+            AdminUser.username: {"icontains": "admin"},
+            (AdminUser.role, Role.name): {"eq": "role", "isnull": False},
+            AdminUser.pk: {"range_": (20, 30), "ne": 25},
+        }
+    )
+    assert q == Q(username__icontains="admin", role__name="role", role__name__isnull=False, pk__range=(20, 30)) & ~Q(
+        pk=25
+    )
+    assert ColQ.all_of({AdminUser.pk: {"ne": 1}}) == ~Q(pk=1)
+    with pytest.raises(TypeError):
+        ColQ.all_of({AdminUser.pk: {"unknown": 1}})
 
 
 def test_col_query(db, django_assert_num_queries):
@@ -299,6 +319,11 @@ def test_col_query(db, django_assert_num_queries):
     with django_assert_num_queries(1):
         q15.first()
 
+    q16 = (
+        ColQuerySet(AdminUser).filter_cols({AdminUser.username: {"icontains": "admin"}, AdminUser.pk: {"gte": 1}}).qs()
+    )
+    assert str(q16.query) == str(AdminUser.objects.filter(username__icontains="admin", pk__gte=1).query)
+
 
 def test_col_update(db, django_assert_num_queries):
     role = Role.objects.create(name="some role name")
@@ -332,3 +357,96 @@ def test_col_update(db, django_assert_num_queries):
     user.refresh_from_db()
     assert user.username == "Admin update"
     assert user.role == other_role
+
+
+def test_col_queryset_helpers(db, django_assert_num_queries):
+    role = Role.objects.create(name="some role name")
+    users = [AdminUser.objects.create(username=f"user {i}", role=role) for i in range(3)]
+
+    with django_assert_num_queries(0):
+        qs = (
+            ColQuerySet(AdminUser)
+            .filter_col(AdminUser.username, startswith="user")
+            .filter_col(AdminUser.role, isnull=False)
+            .order_by_col(AdminUser.pk, desc=True)
+            .select_related_col(AdminUser.role)
+        )
+    assert str(qs.qs().query) == str(
+        AdminUser.objects.filter(username__startswith="user")
+        .filter(role__isnull=False)
+        .order_by("-pk")
+        .select_related("role")
+        .query
+    )
+
+    with django_assert_num_queries(1):
+        assert [i.pk for i in qs.iterator(chunk_size=2)] == [i.pk for i in reversed(users)]
+    with django_assert_num_queries(1):
+        assert list(qs.values_list(AdminUser.pk, flat=True)) == [i.pk for i in reversed(users)]
+    with django_assert_num_queries(1):
+        assert list(qs.values_list(AdminUser.username, (AdminUser.role, Role.name))) == [
+            (i.username, role.name) for i in reversed(users)
+        ]
+    with django_assert_num_queries(1):
+        assert qs.exists()
+    with django_assert_num_queries(1):
+        assert set(qs.in_bulk([users[0].pk, users[1].pk])) == {users[0].pk, users[1].pk}
+    with django_assert_num_queries(1):
+        assert set(qs.in_bulk(field=AdminUser.username)) == {i.username for i in users}
+
+
+def test_col_queryset_combined(db):
+    users = [AdminUser.objects.create(username=f"user {i}") for i in range(3)]
+    union = AdminUser.objects.filter(pk=users[0].pk).union(AdminUser.objects.filter(pk=users[2].pk))
+    intersection = AdminUser.objects.filter(pk__gte=users[1].pk).intersection(AdminUser.objects.all())
+
+    assert [i.pk for i in ColQuerySet(AdminUser, union).order_by_col(AdminUser.pk, desc=True).all()] == [
+        users[2].pk,
+        users[0].pk,
+    ]
+    assert ColQuerySet(AdminUser, intersection).count() == 2
+
+    # 与 QuerySet 一致, 组合查询不支持 filter
+    with pytest.raises(NotSupportedError):
+        ColQuerySet(AdminUser, union).filter_col(AdminUser.pk, users[0].pk).qs()
+
+
+@pytest.mark.parametrize("update_conflicts", [True, False, None])
+def test_col_bulk_upsert(db, django_assert_max_num_queries, monkeypatch, update_conflicts: bool | None):
+    features = connections["default"].features
+    if update_conflicts is False:
+        monkeypatch.setattr(features, "supports_update_conflicts_with_target", False)
+        monkeypatch.setattr(features, "supports_update_conflicts", False)
+    elif update_conflicts is None:
+        # Django 4.1 之前没有这两个特性
+        for obj in (features, *type(features).__mro__):
+            for name in ("supports_update_conflicts_with_target", "supports_update_conflicts"):
+                if name in vars(obj):
+                    monkeypatch.delattr(obj, name)
+        assert not hasattr(features, "supports_update_conflicts")
+
+    AdminPermission.objects.create(key="a", name="old a")
+    permissions = [AdminPermission(key=f"{i}", name=f"new {i}") for i in ["a", "b", "c"]]
+    # 回退时: 2批查询, 1次更新, 1次插入, savepoint 和 release
+    with django_assert_max_num_queries(2 if update_conflicts else 6):
+        ColQuerySet(AdminPermission).bulk_upsert_col(
+            permissions,
+            unique_fields=[AdminPermission.key],
+            update_fields=[AdminPermission.name],
+            batch_size=2,
+        )
+    assert dict(AdminPermission.objects.filter(key__in=["a", "b", "c"]).values_list("key", "name")) == {
+        "a": "new a",
+        "b": "new b",
+        "c": "new c",
+    }
+
+    role = Role.objects.create(name="role")
+    users = [AdminUser.objects.create(username=f"user {i}") for i in range(3)]
+    for user in users:
+        user.role = role
+        user.nickname = f"nickname {user.pk}"
+    with django_assert_max_num_queries(1):
+        rows = ColQuerySet(AdminUser).bulk_update_col(users, [AdminUser.role, AdminUser.nickname])
+    assert rows == 3
+    assert all(i.role_id == role.pk for i in AdminUser.objects.all())
@@ -0,0 +1,83 @@
+import datetime
+import decimal
+import functools
+import json
+from collections import OrderedDict
+
+import pytest
+
+from backend import renderer
+from backend.apps.back.models import AdminUser
+from backend.renderer import CustomJsonEncoder, orjson_dumps, register_json_default
+from backend.response import D
+
+
+class Point:
+    def __init__(self, x: int, y: int):
+        self.x = x
+        self.y = y
+
+    def __repr__(self):
+        return f"Point({self.x}, {self.y})"
+
+
+def make_payload():
+    return {
+        "decimal": decimal.Decimal("1.50"),
+        "datetime": datetime.datetime(2024, 1, 2, 3, 4, 5),
+        "date": datetime.date(2024, 1, 2),
+        "mapping": OrderedDict(a=1),
+        "generator": (i for i in range(3)),
+        "model": AdminUser(username="admin"),
+        "schema": D.ok({"a": 1}),
+        "中文": "中文",
+    }
+
+
+def test_custom_json_encoder():
+    data = json.loads(json.dumps(make_payload(), cls=CustomJsonEncoder))
+    assert data == {
+        "decimal": "1.50",
+        "datetime": "2024-01-02 03:04:05",
+        "date": "2024-01-02",
+        "mapping": {"a": 1},
+        "generator": [0, 1, 2],
+        "model": "admin",
+        "schema": {"code": 200, "msg": "OK", "data": {"a": 1}},
+        "中文": "中文",
+    }
+
+
+@pytest.fixture
+def json_default_registry(monkeypatch: pytest.MonkeyPatch):
+    """测试内注册的类型转换使用副本, 结束后恢复全局注册表和按类型的缓存"""
+    original = renderer.json_default
+    json_default = functools.singledispatch(original.registry[object])
+    for cls, func in original.registry.items():
+        if cls is not object:
+            json_default.register(cls, func)
+    monkeypatch.setattr(renderer, "json_default", json_default)
+    renderer._json_default_dispatch.clear()
+    yield
+    renderer._json_default_dispatch.clear()
+
+
+def test_register_json_default(json_default_registry):
+    assert json.dumps(Point(1, 2), cls=CustomJsonEncoder) == '"Point(1, 2)"'
+
+    @register_json_default
+    def _(o: Point):
+        return [o.x, o.y]
+
+    assert json.dumps(Point(1, 2), cls=CustomJsonEncoder) == "[1, 2]"
+
+
+def test_register_json_default_restored():
+    # 依赖 test_register_json_default 先运行, 注册不泄漏到其他测试
+    assert Point not in renderer.json_default.registry
+    assert json.dumps(Point(1, 2), cls=CustomJsonEncoder) == '"Point(1, 2)"'
+
+
+def test_orjson_dumps():
+    pytest.importorskip("orjson")
+    assert json.loads(orjson_dumps(make_payload())) == json.loads(json.dumps(make_payload(), cls=CustomJsonEncoder))
@@ -0,0 +1,128 @@
+import datetime
+import json
+
+import pytest
+from django.core.paginator import InvalidPage
+from django.http import JsonResponse
+
+from backend.apps.back.models import AdminUser
+from backend.apps.back.schema import AdminUserModelSchema
+from backend.decorator.response import schema_response, stream_json
+from backend.renderer import CustomJsonEncoder
+from backend.response import CursorPaginator, CursorSchema, L, LStream
+
+
+@pytest.fixture
+def admin_users(db):
+    return [AdminUser.objects.create(username=f"user{i}") for i in range(25)]
+
+
+def test_cursor_schema():
+    cursor = CursorSchema(value=123).encode()
+    assert "=" not in cursor
+    assert CursorSchema.decode(cursor).value == 123
+
+    with pytest.raises(InvalidPage):
+        CursorSchema.decode("invalid")
+
+
+def test_cursor_paginator(admin_users: list[AdminUser], django_assert_num_queries):
+    paginator = CursorPaginator(AdminUser.objects.all(), per_page=10, ordering="-id")
+    ids: list[int] = []
+    cursor = None
+    for _ in range(3):
+        with django_assert_num_queries(1):
+            page = paginator.page(cursor)
+        ids.extend(i.pk for i in page)
+        cursor = page.next_cursor
+
+    assert cursor is None
+    assert ids == sorted((i.pk for i in admin_users), reverse=True)
+
+    page = paginator.page()
+    response = L.cursor([i.pk for i in page], page=page)
+    assert response.total == -1
+    assert response.next_cursor == page.next_cursor
+
+    response = L.cursor([i.pk for i in page], page=page, total=paginator.count())
+    assert response.total == 25
+    assert response.total_page == 3
+
+
+def test_cursor_paginator_ascending(admin_users: list[AdminUser]):
+    paginator = CursorPaginator(AdminUser.objects.filter(username__endswith="1"), per_page=2, ordering="id")
+    page = paginator.page()
+    assert [i.username for i in page] == ["user1", "user11"]
+    page = paginator.page(page.next_cursor)
+    assert [i.username for i in page] == ["user21"]
+    assert not page.has_next()
+
+
+def test_cursor_paginator_datetime(admin_users: list[AdminUser]):
+    start = datetime.datetime(2024, 1, 1, 12, 0, 0, 123456)
+    for i, user in enumerate(admin_users):
+        AdminUser.objects.filter(pk=user.pk).update(create_time=start + datetime.timedelta(seconds=i))
+
+    paginator = CursorPaginator(AdminUser.objects.all(), per_page=10, ordering="-create_time")
+    ids: list[int] = []
+    cursor = None
+    for _ in range(3):
+        page = paginator.page(cursor)
+        ids.extend(i.pk for i in page)
+        cursor = page.next_cursor
+    assert cursor is None
+    assert ids == [i.pk for i in reversed(admin_users)]
+
+    with pytest.raises(InvalidPage):
+        paginator.page(CursorSchema(value="not a datetime").encode())
+
+
+def test_stream_json(admin_users: list[AdminUser], django_assert_num_queries):
+    queryset = AdminUser.objects.order_by("id")
+    expected = L.ok([AdminUserModelSchema.from_orm(i) for i in queryset])
+    stream = L.stream(queryset, AdminUserModelSchema.from_orm, chunk_size=10)
+    assert isinstance(stream, LStream)
+
+    with django_assert_num_queries(1):
+        chunks = list(stream_json(stream))
+    assert len(chunks) == 3
+    content = b"".join(chunks)
+    data = json.loads(content)
+    assert data == json.loads(JsonResponse(expected, safe=False, encoder=CustomJsonEncoder).content)
+    assert data["total"] == 25
+
+
+def test_stream_json_error():
+    def items():
+        yield {"id": 1}
+        yield {"id": 2}
+        raise RuntimeError("db error")
+
+    chunks = list(stream_json(L.stream(items(), chunk_size=1)))
+    # 已输出的数据保留, JSON 以 error 字段结束
+    data = json.loads(b"".join(chunks))
+    assert data["data"] == [{"id": 1}, {"id": 2}]
+    assert data["total"] == 2
+    assert data["error"] == "Internal Server Error"
+    assert set(data) == {*L.model_fields, "error"}
+
+
+def test_schema_response_stream_first_chunk_error(rf):
+    def items():
+        raise RuntimeError("db error")
+        yield
+
+    @schema_response
+    def view(request) -> LStream[int]:
+        return L.stream(items())
+
+    # 第一块在视图内读取, 异常交给异常处理
+    with pytest.raises(RuntimeError):
+        view(rf.get("/"))
+
+    @schema_response
+    def view_ok(request) -> LStream[int]:
+        return L.stream(range(3), chunk_size=2)
+
+    response = view_ok(rf.get("/"))
+    assert json.loads(b"".join(response.streaming_content)) == L.ok([0, 1, 2]).model_dump()
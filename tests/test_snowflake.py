@@ -0,0 +1,145 @@
+import threading
+import time
+
+import pytest
+from redis import RedisError
+
+from backend.utils.snowflake import InvalidSystemClockError, Snowflake
+from backend.utils.worker_id import LeasedSnowflake, WorkerIdLease, WorkerIdLeaseExpiredError
+
+
+def test_generate_ids():
+    snowflake = Snowflake(datacenter_id=1, worker_id=2)
+    ids = snowflake.generate_ids(10000)
+    assert len(set(ids)) == 10000
+    assert ids == sorted(ids)
+    assert snowflake.generate_id() > ids[-1]
+
+    data = Snowflake.parse(ids[0])
+    assert (data.datacenter_id, data.worker_id) == (1, 2)
+
+
+def test_generate_id_threads():
+    snowflake = Snowflake(datacenter_id=0, worker_id=0)
+    results: list[list[int]] = []
+
+    def worker():
+        results.append([snowflake.generate_id() for _ in range(5000)] + snowflake.generate_ids(5000))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    ids = [i for r in results for i in r]
+    assert len(set(ids)) == len(ids) == 40000
+
+
+def test_clock_backwards(monkeypatch: pytest.MonkeyPatch):
+    now = 1_700_000_000_000
+    snowflake = Snowflake(datacenter_id=0, worker_id=0, max_backward_ms=5)
+    monkeypatch.setattr(snowflake, "timestamp_ms", lambda: now)
+    first = snowflake.generate_id()
+
+    # 小幅回拨沿用上次时间戳
+    now -= 3
+    second = snowflake.generate_id()
+    assert second > first
+    assert Snowflake.parse(second).timestamp == Snowflake.parse(first).timestamp
+
+    now -= 10
+    with pytest.raises(InvalidSystemClockError):
+        snowflake.generate_id()
+
+
+def test_worker_id_lease(fake_redis):
+    lease1 = WorkerIdLease(fake_redis, "test:snowflake:worker", heartbeat_interval=60)
+    lease2 = WorkerIdLease(fake_redis, "test:snowflake:worker", heartbeat_interval=60)
+    try:
+        ids1 = lease1.acquire()
+        ids2 = lease2.acquire()
+        assert ids1 != ids2
+        assert lease1.renew()
+
+        # 租约被其他进程占用后续期失败
+        fake_redis.set(lease1.get_key(lease1.lease_id), "other")
+        assert not lease1.renew()
+    finally:
+        lease1.release()
+        lease2.release()
+    assert len(fake_redis.keys("test:snowflake:worker:*")) == 1
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_parse_many(use_numpy: bool):
+    ids = [Snowflake(datacenter_id=3, worker_id=7).generate_id() for _ in range(10)]
+    ids += Snowflake(datacenter_id=31, worker_id=0).generate_ids(10)
+    columns = Snowflake.parse_many(ids, use_numpy=use_numpy)
+    parsed = [Snowflake.parse(i) for i in ids]
+    assert list(columns.timestamp) == [i.timestamp for i in parsed]
+    assert list(columns.datacenter_id) == [3] * 10 + [31] * 10
+    assert list(columns.worker_id) == [7] * 10 + [0] * 10
+    assert list(columns.sequence) == [i.sequence for i in parsed]
+
+
+def test_worker_id_lease_expired(fake_redis, monkeypatch: pytest.MonkeyPatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    leased = LeasedSnowflake(fake_redis, "test:snowflake:worker", ttl=60, heartbeat_interval=3600)
+    lease = leased.lease
+    try:
+        snowflake = leased.get(timeout=5)
+        snowflake.generate_id()
+
+        # redis 持续不可用, 续期一直失败
+        def renew():
+            raise RedisError("timeout")
+
+        with monkeypatch.context() as m:
+            m.setattr(lease, "renew", renew)
+            renewed_at = lease.renewed_at
+            assert renewed_at is not None
+            for elapsed in (20, 40):
+                now = renewed_at + elapsed
+                lease.heartbeat()
+            # 未到 ttl - safety_margin 时仍可生成
+            assert leased.get(timeout=0) is snowflake
+
+            now = renewed_at + 45
+            lease.heartbeat()
+            with pytest.raises(WorkerIdLeaseExpiredError):
+                leased.get(timeout=0)
+
+        # redis 恢复后续期成功, 重新可用
+        lease.heartbeat()
+        assert leased.get(timeout=0) is snowflake
+    finally:
+        lease.release()
+
+
+def test_worker_id_lease_lost(fake_redis, monkeypatch: pytest.MonkeyPatch):
+    leased = LeasedSnowflake(fake_redis, "test:snowflake:worker", ttl=60, heartbeat_interval=3600)
+    lease = leased.lease
+    try:
+        snowflake = leased.get(timeout=5)
+        old_ids = (snowflake.datacenter_id, snowflake.worker_id)
+
+        # 租约被其他进程占用, 应用新id之前不能生成id
+        fake_redis.set(lease.get_key(lease.lease_id), "other")
+        checks = []
+        set_ids = snowflake.set_ids
+
+        def on_change(datacenter_id: int, worker_id: int):
+            with pytest.raises(WorkerIdLeaseExpiredError):
+                leased.get(timeout=0)
+            checks.append((datacenter_id, worker_id))
+            set_ids(datacenter_id, worker_id)
+
+        monkeypatch.setattr(lease, "on_change", on_change)
+        lease.heartbeat()
+        assert len(checks) == 1
+        assert leased.get(timeout=0) is snowflake
+        assert (snowflake.datacenter_id, snowflake.worker_id) == checks[0] != old_ids
+    finally:
+        lease.release()
@@ -1,9 +1,28 @@
+import gc
+import re
+import time
+import weakref
 from typing import Any
 
 import pytest
+from asgiref.sync import async_to_sync
+from django.db.models.signals import post_delete
+from django.http import HttpResponse
+from django.test import RequestFactory
 from django.utils import translation
+from redis.exceptions import ConnectionError as RedisConnectionError
 
+from backend.apps.back.models import AdminUser
+from backend.middleware.performance import ServerTimingMiddleware
+from backend.utils import redis_pool
+from backend.utils.cache import RedisSetCache, TTLCache
 from backend.utils.format_number import intword
+from backend.utils.paginator import CachedCountPaginator, count_cache, estimate_count
+from backend.utils.query_analyzer import fingerprint
+from backend.utils.query_logger import QueryLogger
+from backend.utils.redis_logger import RedisLogger
+from backend.utils.redis_pool import RedisFactory
+from backend.utils.server_timing import server_timing
 
 
 @pytest.mark.parametrize(
@@ -88,3 +107,261 @@ def test_intword(language: str, value_expected_list: list[tuple[Any, str]]):
             result = intword(value, digits=2)
             message = f"{language=} {value=} {expected=} {result=}"
             assert result == expected, message
+
+
+def test_ttl_cache(monkeypatch: pytest.MonkeyPatch):
+    now = 0.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+    cache = TTLCache[str, int](maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    # b 最久未使用, 被淘汰
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+    now = 11
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+    # ttl=None 不过期, ttl 覆盖默认过期时间
+    cache.set("d", 4, ttl=None)
+    cache.set("e", 5, ttl=100)
+    now = 50
+    assert cache.get("e") == 5
+    now = 1000
+    assert cache.get("d") == 4
+    assert cache.get("e") is None
+    assert cache.discard_if(lambda _, v: v == 4) == 1
+    assert "d" not in cache
+
+
+def test_cached_count_paginator(db, django_assert_num_queries):
+    count_cache.clear()
+    AdminUser.objects.create(username="a")
+    AdminUser.objects.create(username="b")
+    queryset = AdminUser.objects.filter(username__in=["a", "b"]).order_by("id")
+
+    with django_assert_num_queries(1):
+        assert CachedCountPaginator(queryset, 10).count == 2
+        assert CachedCountPaginator(AdminUser.objects.filter(username__in=["a", "b"]).order_by("id"), 10).count == 2
+    with django_assert_num_queries(1):
+        assert CachedCountPaginator(queryset.filter(username="a"), 10).count == 1
+
+    # 不监听 post_delete, 删除仍走 fast delete, 写入方显式清除缓存
+    assert not post_delete.has_listeners(AdminUser)
+    with django_assert_num_queries(1):
+        AdminUser.objects.filter(username="b").delete()
+    with django_assert_num_queries(0):
+        assert CachedCountPaginator(queryset, 10).count == 2
+    count_cache.invalidate(AdminUser)
+    with django_assert_num_queries(1):
+        assert CachedCountPaginator(queryset, 10).count == 1
+
+    # sqlite 不支持估算, 使用 COUNT(*)
+    assert estimate_count(AdminUser.objects.all()) is None
+    assert CachedCountPaginator(AdminUser.objects.all(), 10, estimate_threshold=0).count == 1
+
+
+def test_query_logger_aggregate(db):
+    with QueryLogger(record_queries=False, slow_queries=2).execute_wrapper() as ql:
+        for _ in range(3):
+            AdminUser.objects.exists()
+    assert ql.count == 3
+    assert ql.queries == []
+    assert len(ql.slow_queries) == 2
+    assert ql.slow_queries[0][0] >= ql.slow_queries[1][0]
+    assert ql.duration >= sum(i[0] for i in ql.slow_queries)
+
+
+def test_server_timing_middleware(db):
+    def view(request):
+        with server_timing("auth"):
+            AdminUser.objects.exists()
+        return HttpResponse()
+
+    request = RequestFactory().get("/")
+    response = ServerTimingMiddleware(view, sample_rate=1, slow_queries=1)(request)
+    metrics = re.findall(r"(?:^|, )([\w-]+);dur=", response["Server-Timing"])
+    assert metrics == ["db", "db-slow-1", "redis", "auth", "resp"]
+    assert 'desc="Database (count: 1)"' in response["Server-Timing"]
+
+    # 未采样的请求不统计
+    response = ServerTimingMiddleware(view, sample_rate=0)(request)
+    assert "Server-Timing" not in response
+
+
+def test_redis_logger(fake_redis):
+    fake_redis.set("r:token:admin:1", "abc")
+    sha = fake_redis.script_load("return redis.call('GET', KEYS[1])")
+    with RedisLogger(slow_commands=1).execute_wrapper() as rl:
+        assert fake_redis.get("r:token:admin:1") == "abc"
+        with RedisLogger(record_commands=False).execute_wrapper() as inner:
+            fake_redis.ping()
+        assert fake_redis.evalsha(sha, 1, "r:token:admin:1") == "abc"
+        pipe = fake_redis.pipeline(transaction=False)
+        pipe.get("r:order:1")
+        pipe.unlink("r:token:admin:1")
+        assert pipe.execute() == [None, 1]
+    assert [(i["command"], i["key"], i["size"], i["status"]) for i in rl.commands] == [
+        ("GET", "r:token:admin", 18, "ok"),
+        ("PING", None, 0, "ok"),
+        ("EVALSHA", "r:token:admin", 40 + 15 + 3, "ok"),
+        ("PIPELINE", "r:order", 9 + 15, "ok"),
+    ]
+    assert rl.count == 4
+    assert len(rl.slow_commands) == 1
+    assert inner.count == 1
+    assert inner.commands == []
+
+    # 未激活时不记录
+    fake_redis.get("r:token:admin:1")
+    assert rl.count == 4
+
+
+def test_query_fingerprint():
+    assert fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'a''b'") == (
+        "SELECT * FROM t WHERE id IN (...) AND name = ?"
+    )
+    assert fingerprint('SELECT "t"."id" FROM "t" WHERE "t"."role_id" = %s LIMIT 21') == (
+        'SELECT "t"."id" FROM "t" WHERE "t"."role_id" = ? LIMIT ?'
+    )
+
+
+def test_repeated_queries(db):
+    for i in range(3):
+        AdminUser.objects.create(username=f"user {i}")
+
+    with QueryLogger(capture_stack=True).execute_wrapper() as ql:
+        for user in AdminUser.objects.all():
+            AdminUser.objects.filter(pk=user.pk).exists()
+    repeated = ql.repeated_queries(threshold=3)
+    assert len(repeated) == 1
+    assert repeated[0].count == 3
+    assert repeated[0].caller is not None
+    assert repeated[0].caller.startswith("tests/test_utils.py:")
+
+
+def test_redis_factory():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    options = {
+        "connection_class": fakeredis.FakeRedisConnection,
+        "server": server,
+        "decode_responses": True,
+        "max_connections": 10,
+        "retries": 2,
+    }
+    factory = RedisFactory({"default": options, "background": {**options, "max_connections": 2}})
+
+    client = factory.get()
+    assert factory.get("default") is client
+    assert factory.get("background") is not client
+    with pytest.raises(KeyError):
+        factory.get("missing")
+
+    client.set("k", "v")
+    assert factory.get("background").get("k") == "v"
+    assert factory.stats() == {
+        "default": {"max_connections": 10, "created": 1, "in_use": 0, "idle": 1},
+        "background": {"max_connections": 2, "created": 1, "in_use": 0, "idle": 1},
+    }
+
+    # fork 后丢弃继承的连接, 客户端继续可用
+    factory.reset()
+    assert factory.stats()["default"]["created"] == 0
+    assert client.get("k") == "v"
+
+    async def get_async():
+        conn = factory.get_async()
+        assert factory.get_async() is conn
+        return conn
+
+    assert async_to_sync(get_async)() is not async_to_sync(get_async)()
+
+
+def test_redis_factory_retry(monkeypatch: pytest.MonkeyPatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from fakeredis.aioredis import FakeAsyncRedisConnection
+
+    options = {"server": fakeredis.FakeServer(), "decode_responses": True, "retries": 2}
+    factory = RedisFactory(
+        {
+            "default": {**options, "connection_class": fakeredis.FakeRedisConnection},
+            "no_retry": {**options, "connection_class": fakeredis.FakeRedisConnection, "retries": 0},
+            "async": {**options, "connection_class": FakeAsyncRedisConnection},
+        }
+    )
+    calls = []
+
+    def fail_once(connection_class):
+        send_command = connection_class.send_command
+
+        def wrapper(self, *args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise RedisConnectionError("Connection closed by server.")
+            return send_command(self, *args, **kwargs)
+
+        monkeypatch.setattr(connection_class, "send_command", wrapper)
+
+    # 执行命令时连接断开, 重连后重试成功
+    fail_once(fakeredis.FakeRedisConnection)
+    assert factory.get().ping()
+    assert len(calls) == 2
+
+    calls.clear()
+    with pytest.raises(RedisConnectionError):
+        factory.get("no_retry").ping()
+    assert len(calls) == 1
+
+    calls.clear()
+    fail_once(FakeAsyncRedisConnection)
+
+    async def ping_async():
+        return await factory.get_async("async").ping()
+
+    assert async_to_sync(ping_async)()
+    assert len(calls) == 2
+
+
+def test_redis_factory_fork_registry():
+    factory = RedisFactory({})
+    assert factory in redis_pool._factories
+    ref = weakref.ref(factory)
+    del factory
+    gc.collect()
+    assert ref() is None
+
+
+def test_redis_set_cache_generation(fake_redis):
+    data = {1: {"a"}}
+    loading = []
+
+    def loader(key: int):
+        value = set(data[key])
+        if not loading:
+            # 加载期间其他进程修改数据并删除缓存
+            data[key] = {"b"}
+            cache.invalidate(key)
+        loading.append(key)
+        return value
+
+    cache = RedisSetCache[int](fake_redis, "test:set", loader=loader)
+    assert cache.get(1) == {"a"}
+    # 删除前加载的旧数据不写回 redis
+    assert not fake_redis.exists(cache.get_key(1))
+
+    cache.local_cache.clear()
+    assert cache.get(1) == {"b"}
+    assert 0 < fake_redis.ttl(cache.get_key(1)) <= cache.expires
+
+    cache.local_cache.clear()
+    assert cache.get(1) == {"b"}
+    assert loading == [1, 1]
+
+    cache.clear()
+    assert fake_redis.keys("test:set:*") == [cache.generation_key]